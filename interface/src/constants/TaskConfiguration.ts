@@ -67,7 +67,7 @@ export const REFORMATTED_CVI_OBJ = {
     "i_index": ["I-Index", 1, "MAX"],
     "banfeld_raferty": ["Banfeld Raferty", -1, "MIN"],
     "modified_hubert_t": ["Modified Hubert T", 1, "MAX"],
-    "baker_hubert_gamma": ["Baker Hubert Gamma", -1, "MIN"],
+    "baker_hubert_gamma": ["Baker Hubert Gamma", 1, "MAX"],
     "davies_bouldin": ["Davies Bouldin", -1, "MIN"],
     "dunns_index": ["Dunns Index", 1, "MAX"],
     "pbm_index": ["PBM Index", 1, "MAX"],
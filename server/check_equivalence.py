@@ -0,0 +1,134 @@
+"""
+Compare the native reimplementations in csmartml against the reference implementations they replace, on fixed
+datasets. Run from /server/:
+
+	pip install s-dbw==0.4.0
+	python check_equivalence.py
+
+Every check prints one line per case and the script exits with status 1 if any case differs.
+"""
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import distance
+from sklearn.base import clone
+from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering, Birch
+from sklearn.datasets import make_blobs
+
+from csmartml.cvi import Validation, DatasetContext
+from csmartml.FitnessCache import canonical_labels
+from csmartml.WarmStarts import WarmStarts
+
+
+def datasets():
+	""" The fixed datasets of the checks: iris and seeded Gaussian blobs with uniform noise """
+	iris = pd.read_csv("./csmartml/datasets/iris.csv").iloc[:, :-1].values.astype(float)
+	blobs, _ = make_blobs(n_samples=600, n_features=4, centers=6, cluster_std=1.5, random_state=0)
+	noise = np.random.RandomState(0).uniform(blobs.min(0), blobs.max(0), (60, 4))
+	return [("iris", iris), ("blobs", np.vstack([blobs, noise]))]
+
+
+def labelings(data):
+	""" KMeans labels, DBSCAN labels with noise, non-contiguous labels and random labels of a dataset """
+	kmeans = KMeans(5, n_init=10, random_state=0).fit(data).labels_
+	yield "kmeans", kmeans
+	yield "dbscan", DBSCAN(eps=np.median(np.std(data, 0)) / 2, min_samples=5).fit(data).labels_
+	yield "gaps", np.array([0, 3, 4, 8, 9])[kmeans]
+	yield "random", np.random.RandomState(1).randint(-1, 4, len(data))
+
+
+def report(check, case, expected, actual):
+	same = np.allclose(expected, actual, rtol=1e-9, atol=1e-12, equal_nan=True)
+	print("%-10s %-24s %-4s %r %r" % (check, case, "OK" if same else "DIFF", np.ravel(expected).tolist()[:4],
+										np.ravel(actual).tolist()[:4]))
+	return same
+
+
+def check_s_dbw():
+	""" Validation.s_dbw against the s_dbw package with the settings it was called with """
+	from s_dbw import S_Dbw
+
+	same = True
+	for name, data in datasets():
+		for labeling, labels in labelings(data):
+			try:
+				expected = S_Dbw(data, labels, centers_id=None, method='Halkidi', alg_noise='bind', centr='mean',
+								 nearest_centr=True, metric='euclidean')
+			except ValueError:
+				continue
+			actual = Validation(np.asmatrix(data), data, labels).s_dbw()
+			same &= report("s_dbw", "%s/%s" % (name, labeling), expected, actual)
+			# the same index read from precomputed pairwise distances, as with a shared DistanceCache
+			cached = DatasetContext(data, distance.pdist(data))
+			actual = Validation(np.asmatrix(data), data, labels, dataset=cached).s_dbw()
+			same &= report("s_dbw", "%s/%s/cached" % (name, labeling), expected, actual)
+	return same
+
+
+def check_dbscan():
+	""" DBSCAN labels of WarmStarts, read from one radius neighbors graph, against sklearn's DBSCAN.fit. The
+	parameters are visited by increasing eps, so that the graph of the largest one is reused for the smaller ones. """
+	same = True
+	for name, data in datasets():
+		scale = np.median(np.std(data, 0))
+		warm_starts = WarmStarts()
+		for eps in (0.5 * scale, 0.2 * scale, 0.1 * scale, 0.8 * scale, 0.3 * scale):
+			for min_samples in (1, 3, 5, 12):
+				for metric in ("euclidean", "manhattan"):
+					estimator = DBSCAN(eps=eps, min_samples=min_samples, metric=metric)
+					expected = clone(estimator).fit(data).labels_
+					actual = warm_starts.fit(estimator, data)
+					same &= report("dbscan", "%s/%.3g/%d/%s" % (name, eps, min_samples, metric), expected, actual)
+	return same
+
+
+def check_agglomerative():
+	""" Agglomerative clusterings cut by WarmStarts from one linkage tree per linkage and metric, against sklearn's
+	AgglomerativeClustering.fit; partitions are compared in canonical form, as the labels are numbered differently """
+	same = True
+	for name, data in datasets():
+		warm_starts = WarmStarts()
+		for linkage in ("ward", "complete", "average", "single"):
+			for metric in (("euclidean",) if linkage == "ward" else ("euclidean", "manhattan", "cosine")):
+				tree = AgglomerativeClustering(linkage=linkage, metric=metric, distance_threshold=0, n_clusters=None,
+											   compute_full_tree=True).fit(data)
+				heights = np.sort(tree.distances_)
+				settings = [{"n_clusters": k} for k in (2, 3, 7, 20)] + \
+						   [{"n_clusters": None, "distance_threshold": heights[int(q * (len(heights) - 1))] * 1.0001}
+							for q in (0.5, 0.9, 0.99)]
+				for setting in settings:
+					estimator = AgglomerativeClustering(linkage=linkage, metric=metric, **setting)
+					expected = canonical_labels(clone(estimator).fit(data).labels_)
+					actual = canonical_labels(warm_starts.fit(estimator, data))
+					case = "%s/%s/%s/%s" % (name, linkage, metric, setting.get("distance_threshold") or setting["n_clusters"])
+					same &= report("agglo", case, expected, actual)
+	return same
+
+
+def check_birch():
+	""" Birch clusterings cut by WarmStarts from one CF-tree per threshold and branching factor, against sklearn's
+	Birch.fit; partitions are compared in canonical form """
+	same = True
+	for name, data in datasets():
+		scale = np.median(np.std(data, 0))
+		warm_starts = WarmStarts()
+		for threshold in (0.1 * scale, 0.3 * scale, scale):
+			for branching_factor in (10, 50):
+				for n_clusters in (None, 2, 3, 7, 20, 500):
+					estimator = Birch(threshold=threshold, branching_factor=branching_factor, n_clusters=n_clusters)
+					expected = canonical_labels(clone(estimator).fit(data).labels_)
+					actual = canonical_labels(warm_starts.fit(estimator, data))
+					case = "%s/%.3g/%d/%s" % (name, threshold, branching_factor, n_clusters)
+					same &= report("birch", case, expected, actual)
+	return same
+
+
+CHECKS = [check_s_dbw, check_dbscan, check_agglomerative, check_birch]
+
+
+if __name__ == '__main__':
+	warnings.filterwarnings("ignore")
+	results = [check() for check in CHECKS]
+	sys.exit(0 if all(results) else 1)
@@ -0,0 +1,79 @@
+import hashlib
+import pickle
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+
+
+def dataset_hash(data):
+	""" Hash of the content and shape of a dataset, identifying it across runs """
+	array = np.ascontiguousarray(np.asarray(data, dtype=np.float64))
+	digest = hashlib.sha1(repr(array.shape).encode())
+	digest.update(array.tobytes())
+	return digest.hexdigest()
+
+
+class EvaluationStore:
+	""" Local SQLite store of the evaluations of past runs, scoped to a dataset, an algorithm and the CVI names.
+	Every evaluated configuration is kept with its fitness; the individuals of the final populations also keep
+	their (unfitted) estimator, so that later runs can seed their populations with them. """
+
+	def __init__(self, path, data, algorithm, cvi):
+		self.path = path
+		self.scope = (dataset_hash(data), algorithm, "_&_".join(metric[0] for metric in cvi))
+		with closing(self.connect()) as connection, connection:
+			connection.execute(
+				"CREATE TABLE IF NOT EXISTS evaluations ("
+				"dataset TEXT, algorithm TEXT, cvi TEXT, config TEXT, partition TEXT, estimator BLOB, "
+				"f1 REAL, f2 REAL, f3 REAL, PRIMARY KEY (dataset, algorithm, cvi, config))")
+
+	def connect(self):
+		return sqlite3.connect(self.path, timeout=30)
+
+	@staticmethod
+	def _fitness(row):
+		# SQLite stores NaN as NULL
+		return tuple(np.nan if value is None else value for value in row)
+
+	def fitness(self):
+		""" Fitness of every stored configuration, by FitnessCache key """
+		with closing(self.connect()) as connection:
+			rows = connection.execute(
+				"SELECT config, f1, f2, f3 FROM evaluations WHERE dataset = ? AND algorithm = ? AND cvi = ?",
+				self.scope).fetchall()
+		return {row[0]: self._fitness(row[1:]) for row in rows}
+
+	def individuals(self, partition):
+		""" Stored estimators of a hyper-partition with their fitness; rows that cannot be unpickled are skipped """
+		with closing(self.connect()) as connection:
+			rows = connection.execute(
+				"SELECT estimator, f1, f2, f3 FROM evaluations WHERE dataset = ? AND algorithm = ? AND cvi = ? "
+				"AND partition = ? AND estimator IS NOT NULL", self.scope + (partition,)).fetchall()
+		individuals = []
+		for row in rows:
+			try:
+				individuals.append((pickle.loads(row[0]), self._fitness(row[1:])))
+			except Exception as e:
+				print(e)
+		return individuals
+
+	def save(self, fitness, individuals):
+		""" Store fitness, a dict of FitnessCache keys to fitness, and individuals, a list of
+		(partition, key, estimator, fitness); existing rows keep their estimator unless a new one is given """
+		with closing(self.connect()) as connection, connection:
+			connection.executemany(
+				"INSERT OR IGNORE INTO evaluations (dataset, algorithm, cvi, config, f1, f2, f3) "
+				"VALUES (?, ?, ?, ?, ?, ?, ?)",
+				[self.scope + (key,) + tuple(map(float, values)) for key, values in fitness.items()])
+			# UPDATE then INSERT OR IGNORE rather than an upsert, which needs SQLite 3.24
+			connection.executemany(
+				"UPDATE evaluations SET partition = ?, estimator = ? "
+				"WHERE dataset = ? AND algorithm = ? AND cvi = ? AND config = ?",
+				[(partition, pickle.dumps(estimator)) + self.scope + (key,)
+					for partition, key, estimator, values in individuals])
+			connection.executemany(
+				"INSERT OR IGNORE INTO evaluations (dataset, algorithm, cvi, config, partition, estimator, f1, f2, f3) "
+				"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+				[self.scope + (key, partition, pickle.dumps(estimator)) + tuple(map(float, values))
+					for partition, key, estimator, values in individuals])
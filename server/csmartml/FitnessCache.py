@@ -0,0 +1,98 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Number of labelings remembered by a LabelingCache
+LABELING_CACHE_SIZE = 1024
+
+
+def canonical_params(estimator):
+	""" Order-independent form of an estimator's hyperparameters, with numpy scalars read as Python values,
+	so that equal configurations produce equal keys whichever operator generated them """
+	params = []
+	for name, value in sorted(estimator.get_params(deep=False).items()):
+		if isinstance(value, np.generic):
+			value = value.item()
+		params.append((name, repr(value)))
+	return tuple(params)
+
+
+def canonical_labels(labels):
+	""" Labels renumbered 0, 1, ... by order of first occurrence, noise (any negative label) as -1,
+	so that every labeling of the same partition has the same form """
+	labels = np.asarray(labels)
+	canonical = np.full(len(labels), -1, dtype=np.int64)
+	clustered = labels >= 0
+	values, first, inverse = np.unique(labels[clustered], return_index=True, return_inverse=True)
+	rank = np.empty(len(values), dtype=np.int64)
+	rank[np.argsort(first)] = np.arange(len(values))
+	canonical[clustered] = rank[inverse.ravel()]
+	return canonical
+
+
+class FitnessCache:
+	""" Fitness of the evaluated configurations, keyed by algorithm and canonical hyperparameters.
+	Entries and counters live in a multiprocessing.Manager, so every search process reads and fills the same table. """
+
+	def __init__(self, manager):
+		self.entries = manager.dict()
+		self.counts = manager.dict({"hits": 0, "misses": 0})
+		self.lock = manager.Lock()
+
+	@staticmethod
+	def key(estimator, *variant):
+		""" Cache key of an estimator; variant separates evaluations of the same configuration done differently """
+		return repr((type(estimator).__name__, canonical_params(estimator)) + variant)
+
+	def get(self, key):
+		""" Cached fitness of key, or None; counts the lookup as a hit or a miss """
+		fitness = self.entries.get(key)
+		with self.lock:
+			outcome = "misses" if fitness is None else "hits"
+			self.counts[outcome] += 1
+		return fitness
+
+	def put(self, key, fitness):
+		self.entries[key] = tuple(fitness)
+
+	def hit_rate(self):
+		hits, misses = self.counts["hits"], self.counts["misses"]
+		return hits / (hits + misses) if hits + misses > 0 else 0.0
+
+	def report(self):
+		hits, misses = self.counts["hits"], self.counts["misses"]
+		return "Fitness cache: {} hits out of {} evaluations ({:.1%}), {} configurations".format(
+			hits, hits + misses, self.hit_rate(), len(self.entries))
+
+
+class LabelingCache:
+	""" Bounded LRU of the fitness of the labelings scored by a process, keyed by a hash of their canonical labels,
+	so that configurations producing the same partition are scored once """
+
+	def __init__(self, max_entries=LABELING_CACHE_SIZE):
+		self.max_entries = max_entries
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	@staticmethod
+	def key(labels, *variant):
+		""" Cache key of canonical labels; variant separates evaluations of the same labeling done differently """
+		return (hashlib.sha1(np.ascontiguousarray(labels, dtype=np.int64).tobytes()).hexdigest(),) + variant
+
+	def get(self, key):
+		fitness = self.entries.get(key)
+		if fitness is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+			self.entries.move_to_end(key)
+		return fitness
+
+	def put(self, key, fitness):
+		self.entries[key] = tuple(fitness)
+		self.entries.move_to_end(key)
+		while len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
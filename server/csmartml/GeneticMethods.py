@@ -25,6 +25,8 @@ class GeneticMethods:
 		for i in range(self.param_size):
 			pos = random.choice(list(range(0, self.param_size)))
 			setattr(tpop[0], self.params[pos], getattr(p, self.params[pos]))
+		# The fit of the offspring may be warm started from its parent's
+		tpop.parent = pop[0]
 
 		return tpop,
 
@@ -35,6 +37,7 @@ class GeneticMethods:
 			pos = random.choice(list(range(0, self.param_size)))
 			setattr(tpop[0], self.params[pos], getattr(tpop2[0], self.params[pos]))
 			setattr(tpop2[0], self.params[pos], getattr(tpop[0], self.params[pos]))
+		tpop.parent, tpop2.parent = pop[0], pop2[0]
 
 		return tpop, tpop2
 
@@ -37,7 +37,7 @@ class Meta_CVI:
     # Static method, format
     def format_cvi(self, index):
         # Evaluation Labels
-        eval_labels = {"baker_hubert_gamma": -1, "banfeld_raferty": -1, "davies_bouldin": -1, "dunns_index": 1,
+        eval_labels = {"baker_hubert_gamma": 1, "banfeld_raferty": -1, "davies_bouldin": -1, "dunns_index": 1,
                        "mcclain_rao": -1, "pbm_index": 1, "ratkowsky_lance": 1, "ray_turi": -1, "scott_symons": -1,
                        "wemmert_gancarski": 1, "xie_beni": -1, "c_index": -1, "g_plus_index": -1, "i_index": 1,
                        "modified_hubert_t": 1, "point_biserial": 1, "s_dbw": -1, "silhouette": 1, "tau_index": 1,
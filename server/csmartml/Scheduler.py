@@ -0,0 +1,200 @@
+import os
+import time
+import signal
+import functools
+import threading
+import multiprocessing
+
+
+# Fitness of the evaluations that failed
+PENALTY = (0, 0, 0)
+
+# Result of the evaluations cancelled at the deadline: no fitness, the search loops drop the individual
+CANCELLED = None
+
+# Seconds between two checks of the workers' deadlines
+SUPERVISE_INTERVAL = 0.1
+
+# Share of the time budget a single evaluation may run for before it is stopped
+EVALUATION_SHARE = 0.25
+
+
+class EvaluationTimeout(BaseException):
+	""" Raised in a worker when its evaluation outlives its time limit; a BaseException, so that the error handling of
+	the evaluation does not turn it into a failed fitness """
+
+
+def _timeout(signum, frame):
+	raise EvaluationTimeout()
+
+
+def available_cores():
+	""" Number of cores this process may run on """
+	if hasattr(os, "sched_getaffinity"):
+		return len(os.sched_getaffinity(0))
+	return multiprocessing.cpu_count()
+
+
+def _work(evaluate, tasks, results, state, timeouts):
+	""" Worker loop: evaluate the individuals of any partition until the None sentinel.
+	An evaluation may run for its time limit, and not past the deadline: an interval timer then interrupts it and the
+	worker returns CANCELLED and goes on with the next task.
+	state holds (busy, partition, index, deadline) of the running evaluation for the supervisor; whichever of the
+	worker and the supervisor clears busy first delivers the result. """
+	limited = hasattr(signal, "setitimer")
+	if limited:
+		signal.signal(signal.SIGALRM, _timeout)
+	while True:
+		task = tasks.get()
+		if task is None:
+			break
+		partition, index, individual, args, deadline, limit = task
+		remaining = deadline - time.time()
+		if remaining < 0:
+			results[partition].put((index, CANCELLED))
+			continue
+		with state.get_lock():
+			state[:] = [1, partition, index, deadline]
+		try:
+			if limited and min(limit, remaining) < float("inf"):
+				signal.setitimer(signal.ITIMER_REAL, max(min(limit, remaining), 1e-3))
+			try:
+				fitness = evaluate(individual, *args)
+			finally:
+				if limited:
+					signal.setitimer(signal.ITIMER_REAL, 0)
+		except EvaluationTimeout:
+			with timeouts.get_lock():
+				timeouts.value += 1
+			fitness = CANCELLED
+		except Exception as e:
+			print(e)
+			fitness = PENALTY
+		with state.get_lock():
+			state[0] = 0
+		results[partition].put((index, fitness))
+
+
+class Scheduler:
+	""" Bounded pool of worker processes, one per available core by default, evaluating the individuals submitted
+	by the search loops of all hyper-partitions from a single task queue, so that idle cores pick up work from any
+	partition. Workers are forked on start, before the search threads run, and inherit evaluate.
+	An optional lookup(individual, *args) returning a known fitness, or None, is tried before submitting an individual,
+	an optional key(individual, *args) groups the identical individuals of a batch, which are evaluated once, and an
+	optional store(individual, fitness, *args) is called, in this process, with every fitness a worker returns.
+	Every evaluation is stopped by its worker after EVALUATION_SHARE of the time budget, returning CANCELLED, so that
+	runaway fits free their worker for the rest of the search. Evaluations still running at the deadline, such as fits
+	stuck in native code the timer cannot interrupt, are cancelled: a supervisor thread kills their worker and returns
+	CANCELLED; evaluations not started by then are CANCELLED directly. Killed workers are not replaced: past the
+	deadline a worker could only return CANCELLED, and forking while the search threads hold locks could deadlock the
+	child on a lock inherited in a locked state. """
+
+	def __init__(self, evaluate, partitions, workers=None, lookup=None, key=None, store=None):
+		self.evaluate = evaluate
+		self.lookup = lookup
+		self.key = key
+		self.store = store
+		self.size = workers or available_cores()
+		self.deadline = float("inf")
+		# Seconds a single evaluation may run for
+		self.limit = float("inf")
+		self.cancelled = 0
+		# Number of evaluations stopped at their time limit by the workers
+		self.timeouts = multiprocessing.Value('i', 0)
+		self.partitions = {partition: number for number, partition in enumerate(partitions)}
+		# SimpleQueues write synchronously, so killing a busy worker cannot leave a message half sent
+		self.tasks = multiprocessing.SimpleQueue()
+		self.results = [multiprocessing.SimpleQueue() for _ in partitions]
+		self.workers = []
+		self.states = []
+		self.stopping = threading.Event()
+		self.supervisor = None
+
+	def spawn(self, state):
+		worker = multiprocessing.Process(target=_work, args=(self.evaluate, self.tasks, self.results, state, self.timeouts),
+										 daemon=True)
+		worker.start()
+		return worker
+
+	def start(self):
+		for _ in range(self.size):
+			state = multiprocessing.Array('d', 4)
+			self.states.append(state)
+			self.workers.append(self.spawn(state))
+		self.stopping.clear()
+		self.supervisor = threading.Thread(target=self.supervise, daemon=True)
+		self.supervisor.start()
+
+	def supervise(self):
+		""" Kill the workers whose evaluation outlived its deadline, returning CANCELLED for it; once no worker is
+		left, answer the tasks still queued with CANCELLED """
+		while not self.stopping.wait(SUPERVISE_INTERVAL):
+			for slot, state in enumerate(self.states):
+				if self.workers[slot] is None:
+					continue
+				with state.get_lock():
+					overdue = state[0] and time.time() > state[3]
+					if overdue:
+						state[0] = 0
+						self.workers[slot].terminate()
+						self.results[int(state[1])].put((int(state[2]), CANCELLED))
+				if overdue:
+					self.cancelled += 1
+					self.workers[slot].join()
+					self.workers[slot] = None
+			# Without a worker, the supervisor is the only reader of the task queue
+			if all(worker is None for worker in self.workers):
+				while not self.tasks.empty():
+					number, index = self.tasks.get()[:2]
+					self.results[number].put((index, CANCELLED))
+
+	def budget(self, seconds):
+		""" Cancel the evaluations still running seconds from now, and stop any evaluation after EVALUATION_SHARE of
+		them """
+		self.deadline = time.time() + seconds
+		self.limit = EVALUATION_SHARE * seconds
+
+	def close(self):
+		self.stopping.set()
+		if self.supervisor is not None:
+			self.supervisor.join()
+		workers = [worker for worker in self.workers if worker is not None]
+		for _ in workers:
+			self.tasks.put(None)
+		for worker in workers:
+			worker.join()
+		self.workers = []
+		self.states = []
+
+	def map(self, partition, evaluate, individuals, *args):
+		""" toolbox.map of a partition: evaluate the individuals in the pool and return their fitness in order.
+		evaluate is the toolbox's evaluate, which the workers already hold; args are passed on to it. """
+		number = self.partitions[partition]
+		individuals = list(individuals)
+		fitnesses = [None] * len(individuals)
+		# Index of the first individual of the batch with the same key, which alone is looked up and evaluated
+		first = list(range(len(individuals)))
+		if self.key is not None:
+			seen = dict()
+			for index, individual in enumerate(individuals):
+				first[index] = seen.setdefault(self.key(individual, *args), index)
+		submitted = 0
+		for index, individual in enumerate(individuals):
+			if first[index] != index:
+				continue
+			if self.lookup is not None:
+				fitnesses[index] = self.lookup(individual, *args)
+			if fitnesses[index] is None and time.time() > self.deadline:
+				fitnesses[index] = CANCELLED
+			elif fitnesses[index] is None:
+				self.tasks.put((number, index, individual, args, self.deadline, self.limit))
+				submitted += 1
+		for _ in range(submitted):
+			index, fitness = self.results[number].get()
+			fitnesses[index] = fitness
+			if self.store is not None and fitness is not CANCELLED:
+				self.store(individuals[index], fitness, *args)
+		return [fitnesses[index] for index in first]
+
+	def mapper(self, partition):
+		return functools.partial(self.map, partition)
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import weakref
+import numpy as np
+from scipy.spatial import distance
+
+
+# Number of distances computed at once while filling the cache
+DISTANCE_BLOCK_ELEMENTS = 2 ** 22
+
+
+def shared_directory():
+	""" Directory of the memory-mapped files: the RAM-backed /dev/shm when available """
+	if os.path.isdir("/dev/shm"):
+		return "/dev/shm"
+	return tempfile.gettempdir()
+
+
+def _remove(path, pid):
+	""" Remove a backing file, from the process that created it only: forked processes inherit its finalizer """
+	if os.getpid() == pid and os.path.exists(path):
+		os.remove(path)
+
+
+class SharedArray:
+	""" Read-only numpy array backed by a memory-mapped file.
+	Processes that inherit or unpickle it map the same file, so the content is never copied between them.
+	The file of an array made by create is removed by unlink, or at the latest when that array is garbage collected or
+	the interpreter exits. """
+
+	def __init__(self, path, shape, dtype):
+		self.path = path
+		self.shape = tuple(shape)
+		self.dtype = np.dtype(dtype)
+		self.array = np.memmap(path, dtype=self.dtype, mode='r', shape=self.shape)
+
+	@classmethod
+	def create(cls, shape, dtype, fill):
+		""" Create the backing file, let fill(array) write its content, then attach it read-only """
+		fd, path = tempfile.mkstemp(prefix="csmartml-", suffix=".dat", dir=shared_directory())
+		os.close(fd)
+		try:
+			writable = np.memmap(path, dtype=dtype, mode='w+', shape=tuple(shape))
+			fill(writable)
+			writable.flush()
+			del writable
+			shared = cls(path, shape, dtype)
+		except BaseException:
+			os.remove(path)
+			raise
+		shared.finalizer = weakref.finalize(shared, _remove, path, os.getpid())
+		return shared
+
+	@classmethod
+	def from_array(cls, array):
+		array = np.ascontiguousarray(array)
+
+		def fill(out):
+			out[...] = array
+
+		return cls.create(array.shape, array.dtype, fill)
+
+	# Pickle by reference to the file, not by content
+	def __getstate__(self):
+		return {"path": self.path, "shape": self.shape, "dtype": self.dtype.str}
+
+	def __setstate__(self, state):
+		self.__init__(state["path"], state["shape"], state["dtype"])
+
+	def unlink(self):
+		""" Remove the backing file; processes that mapped it keep their view until they release it """
+		finalizer = getattr(self, "finalizer", None)
+		if finalizer is not None:
+			finalizer()
+		elif os.path.exists(self.path):
+			os.remove(self.path)
+
+
+class DistanceCache:
+	""" Pairwise Euclidean distances of a dataset, computed once in row tiles and kept as the condensed upper triangle
+	(in the order of scipy's pdist) in a SharedArray, so that every search process reads the same copy.
+	Use dtype=np.float32 to halve its size again. """
+
+	def __init__(self, data, dtype=np.float64):
+		data = np.asarray(data, dtype=float)
+		size = len(data)
+		rows = max(1, DISTANCE_BLOCK_ELEMENTS // max(1, size))
+		# Offset of the first distance of every row in the condensed array
+		offsets = np.arange(size + 1) * size - np.arange(size + 1) * np.arange(1, size + 2) // 2
+
+		def fill(out):
+			for start in range(0, size, rows):
+				stop = min(start + rows, size)
+				block = distance.cdist(data[start:stop], data[start:])
+				upper = np.arange(size - start)[None, :] > np.arange(stop - start)[:, None]
+				out[offsets[start]:offsets[stop]] = block[upper]
+
+		self.matrix = SharedArray.create((size * (size - 1) // 2,), dtype, fill)
+
+	@property
+	def array(self):
+		return self.matrix.array
+
+	def close(self):
+		self.matrix.unlink()
+
+
+class SimilarityCache:
+	""" Negative squared Euclidean distances of a dataset, the similarities AffinityPropagation clusters, computed once
+	in row tiles into a SharedArray, with their median, AffinityPropagation's default preference. """
+
+	def __init__(self, data):
+		data = np.asarray(data, dtype=float)
+		size = len(data)
+		rows = max(1, DISTANCE_BLOCK_ELEMENTS // max(1, size))
+
+		def fill(out):
+			for start in range(0, size, rows):
+				out[start:start + rows] = -distance.cdist(data[start:start + rows], data, "sqeuclidean")
+
+		self.matrix = SharedArray.create((size, size), np.float64, fill)
+		self.preference = float(np.median(self.matrix.array))
+
+	@property
+	def array(self):
+		return self.matrix.array
+
+	def close(self):
+		self.matrix.unlink()
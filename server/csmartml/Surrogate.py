@@ -0,0 +1,81 @@
+import random
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from .Scheduler import PENALTY
+
+
+class Surrogate:
+	""" Random forest regression of the fitness of a hyper-partition's individuals from their hyperparameters,
+	trained online on the evaluated ones and used to skip the offspring that are very likely dominated.
+	A candidate is skipped when its optimistic prediction (mean plus one standard deviation across the trees,
+	towards better values) is dominated by the front of the evaluated individuals. A share of the candidates,
+	explore, is always evaluated so that the model keeps learning. """
+
+	def __init__(self, params, weights, min_samples=20, refit_every=10, explore=0.1):
+		self.params = params
+		self.weights = np.asarray(weights, dtype=float)
+		self.min_samples = min_samples
+		self.refit_every = refit_every
+		self.explore = explore
+		self.categories = dict()
+		self.inputs = list()
+		self.outputs = list()
+		self.model = None
+		self.fitted_size = 0
+		self.screened = 0
+
+	def encode(self, estimator):
+		""" Numeric hyperparameters as they are, the others as the order in which their values were first seen """
+		row = list()
+		for param in self.params:
+			value = getattr(estimator, param)
+			if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+				row.append(float(value))
+			else:
+				codes = self.categories.setdefault(param, dict())
+				row.append(float(codes.setdefault(repr(value), len(codes))))
+		return row
+
+	def add(self, estimators, fitnesses):
+		""" Learn from evaluated individuals; failed, cancelled and undefined evaluations are left out """
+		for estimator, fitness in zip(estimators, fitnesses):
+			if fitness is None or tuple(fitness) == PENALTY or not np.all(np.isfinite(fitness)):
+				continue
+			self.inputs.append(self.encode(estimator))
+			self.outputs.append([float(value) for value in fitness])
+
+	def fit(self):
+		if len(self.inputs) < self.min_samples:
+			return False
+		if self.model is None or len(self.inputs) - self.fitted_size >= self.refit_every:
+			self.model = RandomForestRegressor(n_estimators=50, min_samples_leaf=2, random_state=0)
+			self.model.fit(np.array(self.inputs), np.array(self.outputs))
+			self.fitted_size = len(self.inputs)
+		return True
+
+	def front(self):
+		""" Non-dominated weighted fitness of the evaluated individuals (larger is better) """
+		points = np.array(self.outputs) * self.weights
+		dominated = np.zeros(len(points), dtype=bool)
+		for i, point in enumerate(points):
+			dominated[i] = np.any(np.all(points >= point, axis=1) & np.any(points > point, axis=1))
+		return points[~dominated]
+
+	def screen(self, estimators):
+		""" Indices of the candidates worth a real evaluation """
+		if not estimators or not self.fit():
+			return list(range(len(estimators)))
+
+		inputs = np.array([self.encode(estimator) for estimator in estimators])
+		trees = np.stack([tree.predict(inputs) for tree in self.model.estimators_])
+		optimistic = trees.mean(axis=0) * self.weights + trees.std(axis=0) * np.abs(self.weights)
+		front = self.front()
+		chosen = list()
+		for i, point in enumerate(optimistic):
+			dominated = np.any(np.all(front >= point, axis=1) & np.any(front > point, axis=1))
+			if not dominated or random.random() < self.explore:
+				chosen.append(i)
+		self.screened += len(estimators) - len(chosen)
+		return chosen
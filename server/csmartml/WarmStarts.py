@@ -0,0 +1,256 @@
+import numbers
+from collections import OrderedDict
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.cluster.hierarchy import linkage
+from sklearn.base import clone
+from sklearn.cluster import KMeans, DBSCAN, Birch, AgglomerativeClustering, SpectralClustering, OPTICS, k_means, \
+	compute_optics_graph, cluster_optics_xi, cluster_optics_dbscan
+from sklearn.manifold import spectral_embedding
+from sklearn.metrics.pairwise import pairwise_kernels
+from sklearn.neighbors import NearestNeighbors, kneighbors_graph
+from sklearn.utils import check_random_state
+
+from .FitnessCache import canonical_params, canonical_labels
+
+
+# Number of fitted states remembered by a WarmStarts
+WARM_STARTS_SIZE = 64
+
+# Number of spectral clustering nearest neighbors graphs remembered by a WarmStarts
+AFFINITY_CACHE_SIZE = 8
+
+# Hyperparameters that do not change the fitted state an estimator is warm started from, by estimator
+WARM_PARAMS = {
+	KMeans: ("n_init", "max_iter", "init", "algorithm", "verbose", "copy_x"),
+	Birch: ("n_clusters",),
+	DBSCAN: ("eps", "min_samples", "algorithm", "leaf_size", "n_jobs"),
+	AgglomerativeClustering: ("n_clusters", "distance_threshold", "compute_full_tree", "compute_distances", "memory"),
+	SpectralClustering: ("n_clusters", "n_init", "n_components", "assign_labels", "n_jobs", "verbose"),
+	OPTICS: ("xi", "eps", "cluster_method", "min_cluster_size", "predecessor_correction", "algorithm", "leaf_size",
+			 "n_jobs", "memory"),
+}
+
+# Hyperparameters of a spectral clustering that do not change its affinity matrix
+AFFINITY_PARAMS = WARM_PARAMS[SpectralClustering] + ("eigen_solver", "eigen_tol", "random_state")
+
+# Scipy names of the agglomerative clustering metrics
+LINKAGE_METRICS = {"euclidean": "euclidean", "l1": "cityblock", "manhattan": "cityblock", "cosine": "cosine"}
+
+
+class WarmStarts:
+	""" Bounded LRU of the fitted states of a process, from which the offspring of evaluated individuals are fit
+	faster. KMeans starts from the centers of the individual's parent with a single initialization, when this process
+	fitted the parent and the two only differ in n_init, max_iter or init; without a known parent it is fit as
+	configured. Birch builds its CF-tree once per threshold and branching factor and keeps the linkage tree of the subclusters, so
+	that every n_clusters is a cut of it over the subclusters, and DBSCAN reads the neighborhoods
+	of any eps up to the largest one seen from its radius neighbors graph. Agglomerative clustering builds the full
+	linkage tree once per linkage and metric, and every n_clusters or distance_threshold is a cut of it. Spectral
+	clustering keeps its nearest neighbors graphs and spectral embeddings, with as many eigenvectors as the largest
+	number of components asked so far, so that only the final k-means runs for another n_clusters or n_init; the labels
+	of unseeded fits that reuse an embedding are not those of a fresh fit, which draws its own random stream. OPTICS keeps the
+	ordering, reachability and core distances of each min_samples, from which every xi or eps clustering is extracted.
+	variant separates states fitted on different data, such as the subsamples of the fidelity levels. """
+
+	def __init__(self, max_entries=WARM_STARTS_SIZE):
+		self.max_entries = max_entries
+		self.entries = OrderedDict()
+		self.affinities = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	@staticmethod
+	def key(estimator, *variant, ignored=None):
+		ignored = WARM_PARAMS[type(estimator)] if ignored is None else ignored
+		params = tuple(param for param in canonical_params(estimator) if param[0] not in ignored)
+		return (type(estimator).__name__, params) + variant
+
+	def get(self, key):
+		state = self.entries.get(key)
+		if state is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+			self.entries.move_to_end(key)
+		return state
+
+	def put(self, key, state):
+		self.entries[key] = state
+		self.entries.move_to_end(key)
+		while len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
+
+	def fit(self, estimator, data, *variant, parent=None):
+		""" Labels of estimator on data, warm started when possible; None for the estimators without a warm start.
+		parent is the estimator of the individual's parent, if any. """
+		if type(estimator) not in WARM_PARAMS:
+			return None
+		if isinstance(estimator, KMeans):
+			return self.kmeans(estimator, data, *variant, parent=parent)
+		if isinstance(estimator, AgglomerativeClustering):
+			return self.cut(estimator, data, *variant)
+		if isinstance(estimator, SpectralClustering):
+			return self.spectral(estimator, data, *variant)
+		if isinstance(estimator, OPTICS):
+			return self.optics(estimator, data, *variant)
+		key = self.key(estimator, *variant)
+		state = self.get(key)
+
+		if isinstance(estimator, Birch):
+			n_clusters = estimator.n_clusters
+			if n_clusters is not None and not isinstance(n_clusters, numbers.Integral):
+				return estimator.fit(data).labels_
+			if state is None:
+				# Without a global clustering, Birch labels every point by its nearest subcluster
+				birch = clone(estimator).set_params(n_clusters=None, compute_labels=True).fit(data)
+				centers = birch.subcluster_centers_
+				state = (birch.labels_, linkage(centers, method="ward") if len(centers) > 1 else None)
+				self.put(key, state)
+			# The global clustering is a ward agglomerative clustering of the subclusters, unless there are too few
+			subclusters, tree = state
+			if n_clusters is None or tree is None or len(tree) + 1 < n_clusters:
+				return subclusters
+			return tree_cut(tree, len(tree) + 1 - n_clusters)[subclusters]
+
+		if state is None or state[0] < estimator.eps:
+			params = estimator.get_params()
+			neighbors = NearestNeighbors(radius=estimator.eps, metric=params["metric"], p=params["p"] or 2,
+										 metric_params=params["metric_params"]).fit(data)
+			state = (estimator.eps, neighbors.radius_neighbors_graph(mode="distance"))
+			self.put(key, state)
+		return dbscan_labels(state[1], estimator.eps, estimator.min_samples)
+
+	def kmeans(self, estimator, data, *variant, parent=None):
+		""" Labels of a KMeans, started from the centers of its parent when they are known. The centers of every fit
+		are kept under all of its hyperparameters, for its own offspring. """
+		own = self.key(estimator, *variant, ignored=())
+		centers = None
+		if parent is not None and self.key(parent, *variant) == self.key(estimator, *variant):
+			centers = self.get(self.key(parent, *variant, ignored=()))
+		if centers is not None:
+			estimator = clone(estimator).set_params(init=centers, n_init=1)
+		labels = estimator.fit(data).labels_
+		self.put(own, estimator.cluster_centers_)
+		return labels
+
+	def cut(self, estimator, data, *variant):
+		params = estimator.get_params()
+		# sklearn renamed affinity to metric
+		metric = LINKAGE_METRICS.get(params.get("metric") or params.get("affinity") or "euclidean")
+		if metric is None or params["connectivity"] is not None:
+			return None
+		key = self.key(estimator, *variant)
+		tree = self.get(key)
+		if tree is None:
+			tree = linkage(data, method=params["linkage"], metric=metric)
+			self.put(key, tree)
+		if params["distance_threshold"] is not None:
+			# sklearn merges the clusters closer than distance_threshold
+			return tree_cut(tree, np.count_nonzero(tree[:, 2] < params["distance_threshold"]))
+		return tree_cut(tree, len(data) - params["n_clusters"])
+
+
+	def spectral(self, estimator, data, *variant):
+		params = estimator.get_params()
+		if not isinstance(params["affinity"], str) or params["affinity"].startswith("precomputed") or \
+				params["assign_labels"] != "kmeans":
+			return None
+		components = params["n_components"] or params["n_clusters"]
+		# A seeded fit is reproduced exactly: its embedding is only reused for the same number of components, and its
+		# k-means continues the random stream from where the embedding left it, as in SpectralClustering.fit
+		seeded = isinstance(params["random_state"], numbers.Integral)
+		key = self.key(estimator, *variant)
+		state = self.get(key)
+		if state is None or state[0].shape[1] < components or seeded and state[0].shape[1] != components:
+			random_state = check_random_state(params["random_state"])
+			embedding = spectral_embedding(
+				self.affinity(estimator, data, *variant), n_components=components, eigen_solver=params["eigen_solver"],
+				random_state=random_state, eigen_tol=params["eigen_tol"], drop_first=False)
+			state = (embedding, random_state.get_state())
+			self.put(key, state)
+		embedding, stream = state
+		random_state = check_random_state(params["random_state"])
+		if seeded:
+			random_state.set_state(stream)
+		return k_means(embedding[:, :components], params["n_clusters"], random_state=random_state,
+					   n_init=params["n_init"])[1]
+
+	def optics(self, estimator, data, *variant):
+		""" Labels of an OPTICS clustering extracted from the reachability graph of its min_samples, as OPTICS.fit does """
+		params = estimator.get_params()
+		if params["cluster_method"] not in ("xi", "dbscan"):
+			return None
+		key = self.key(estimator, *variant)
+		graph = self.get(key)
+		if graph is None:
+			graph = compute_optics_graph(
+				data, min_samples=params["min_samples"], max_eps=params["max_eps"], metric=params["metric"],
+				p=params["p"], metric_params=params["metric_params"], algorithm=params["algorithm"],
+				leaf_size=params["leaf_size"], n_jobs=params["n_jobs"])
+			self.put(key, graph)
+		ordering, core_distances, reachability, predecessor = graph
+
+		if params["cluster_method"] == "xi":
+			return cluster_optics_xi(
+				reachability=reachability, predecessor=predecessor, ordering=ordering, min_samples=params["min_samples"],
+				min_cluster_size=params["min_cluster_size"], xi=params["xi"],
+				predecessor_correction=params["predecessor_correction"])[0]
+		eps = params["max_eps"] if params["eps"] is None else params["eps"]
+		if eps > params["max_eps"]:
+			raise ValueError("Specify an epsilon smaller than %s. Got %s." % (params["max_eps"], eps))
+		return cluster_optics_dbscan(reachability=reachability, core_distances=core_distances, ordering=ordering, eps=eps)
+
+	def affinity(self, estimator, data, *variant):
+		""" Affinity matrix of a spectral clustering, as SpectralClustering.fit builds it. Only nearest neighbors
+		graphs are kept: kernel affinities are dense and depend on a continuous gamma, drawn anew for most individuals,
+		while the embeddings of the individuals that inherit a gamma are kept anyway. """
+		params = estimator.get_params()
+		if params["affinity"] != "nearest_neighbors":
+			kernel_params = dict(params["kernel_params"] or {}, gamma=params["gamma"], degree=params["degree"],
+								 coef0=params["coef0"])
+			return pairwise_kernels(data, metric=params["affinity"], filter_params=True, **kernel_params)
+
+		key = self.key(estimator, *variant, ignored=AFFINITY_PARAMS)
+		matrix = self.affinities.get(key)
+		if matrix is None:
+			connectivity = kneighbors_graph(data, n_neighbors=params["n_neighbors"], include_self=True)
+			matrix = 0.5 * (connectivity + connectivity.T)
+		self.affinities[key] = matrix
+		self.affinities.move_to_end(key)
+		while len(self.affinities) > AFFINITY_CACHE_SIZE:
+			self.affinities.popitem(last=False)
+		return matrix
+
+
+def tree_cut(tree, merges):
+	""" Labels of the points of a scipy linkage tree after its first merges, as the connected components of the
+	edges from the merged nodes to the nodes they form """
+	n = len(tree) + 1
+	children = tree[:merges, :2].astype(np.int64).ravel()
+	parents = np.repeat(np.arange(n, n + merges), 2)
+	edges = csr_matrix((np.ones(len(children)), (children, parents)), shape=(n + merges, n + merges))
+	return connected_components(edges, directed=False)[1][:n]
+
+
+def dbscan_labels(graph, eps, min_samples):
+	""" DBSCAN labels from a radius neighbors graph, without self loops, of any radius not below eps.
+	Clusters are the connected components of the core points, numbered by their first point, and a border point
+	joins the first of the clusters among its neighbors, as in sklearn's DBSCAN """
+	n = graph.shape[0]
+	rows = np.repeat(np.arange(n), np.diff(graph.indptr))
+	within = graph.data <= eps
+	rows, cols = rows[within], graph.indices[within]
+	# Every point is its own neighbor
+	core = np.bincount(rows, minlength=n) + 1 >= min_samples
+
+	links = core[rows] & core[cols]
+	adjacency = csr_matrix((np.ones(np.count_nonzero(links)), (rows[links], cols[links])), shape=(n, n))
+	labels = np.full(n, -1, dtype=np.int64)
+	labels[core] = canonical_labels(connected_components(adjacency, directed=False)[1][core])
+	border = ~core[rows] & core[cols]
+	joined = np.full(n, n, dtype=np.int64)
+	np.minimum.at(joined, rows[border], labels[cols[border]])
+	labels[joined < n] = joined[joined < n]
+	return labels
@@ -2,15 +2,25 @@ import pandas as pd
 import numpy as np
 import time
 import sys
+import math
+import threading
 import multiprocessing
 
 from .MetaCVI import Meta_CVI
 from .MetaAlgorithm import Algorithm
-from .cvi import Validation
-from multiprocessing import Process
+from .cvi import Validation, DatasetContext
+from .SharedData import DistanceCache, SharedArray, SimilarityCache
+from .FitnessCache import FitnessCache, LabelingCache, canonical_labels
+from .EvaluationStore import EvaluationStore
+from .Scheduler import Scheduler, PENALTY
+from .Surrogate import Surrogate
+from .WarmStarts import WarmStarts
 
 from sklearn import metrics
+from sklearn.base import clone
+from sklearn.cluster import AffinityPropagation, MiniBatchKMeans
 from deap import base, creator, tools, algorithms
+from deap.benchmarks.tools import hypervolume
 
 from .HyperPartitions import *
 from .GeneticMethods import *
@@ -18,7 +28,7 @@ from .GeneticMethods import *
 
 
 class CSmartML:
-	def __init__(self, filename, population, time_budget, publish, meta_cvi=False, algorithm=None, cvi=None, dataset=None, result="multi"):
+	def __init__(self, filename, population, time_budget, publish, meta_cvi=False, algorithm=None, cvi=None, dataset=None, result="multi", distance_cache=False, sample_size=None, store=None, workers=None, racing=False, fidelities=None, surrogate=False):
 
 		self.time = time_budget
 		self.filename = filename
@@ -55,6 +65,53 @@ class CSmartML:
 		# 	"label": "Generating hyper-partitions...",
 		# 	"metric": self.resolve_metrics()}, "message")
 
+		# Number of evaluation worker processes (one per available core by default)
+		self.workers = workers
+		# Optional: race the hyper-partitions by successive halving instead of searching all of them for the whole budget
+		self.racing = racing
+
+		# The dataset as one contiguous float array in shared memory, read in place by every evaluation
+		self.shared_data = SharedArray.from_array(np.asarray(self.data, dtype=np.float64))
+		self.matrix = self.shared_data.array
+
+		# Optional: evaluations of past runs on the same dataset, algorithm and metrics, kept in a SQLite file
+		self.evaluation_store = EvaluationStore(store, self.matrix, self.algorithm, self.cvi) if store else None
+
+		# Dataset statistics shared by the evaluations of all the individuals
+		# Optional: pairwise distances computed once, in a memory-mapped file shared by all search processes; True keeps
+		# them as float64, or give the dtype to keep them in (e.g. np.float32 for half the size)
+		self.distance_cache = None
+		if distance_cache is True:
+			self.distance_cache = DistanceCache(self.matrix)
+		elif distance_cache:
+			self.distance_cache = DistanceCache(self.matrix, distance_cache)
+		distances = self.distance_cache.array if self.distance_cache is not None else None
+		self.dataset_context = DatasetContext(self.matrix, distances)
+		# Optional: pair-based metrics estimated on subsamples of this size during the search
+		self.sample_size = sample_size
+		# When sampling, only the final exact rescore reads the dataset statistics: it builds them on first use
+		if sample_size is None or sample_size >= len(self.matrix):
+			self.dataset_context.precompute([metric[0] for metric in self.cvi])
+		# Affinity propagation searches fit on similarities computed once, in a file shared by all search processes
+		self.similarity_cache = SimilarityCache(self.matrix) if self.algorithm == "ap" else None
+		# Optional: multi-fidelity schedule, a list of (fraction, keep): every batch of individuals is first scored on a
+		# stratified subsample holding that fraction of the dataset and only the best keep fraction goes on to the next
+		# level, then to the full dataset
+		self.fidelities = fidelities or []
+		self.fidelity_data = [self.matrix[subset] for subset in fidelity_subsets(self.matrix, [f for f, _ in self.fidelities])]
+		self.fidelity_contexts = [DatasetContext(data) for data in self.fidelity_data]
+		for context in self.fidelity_contexts:
+			context.precompute([metric[0] for metric in self.cvi])
+		# Optional: skip the offspring a random forest trained on the evaluated individuals predicts to be dominated
+		self.surrogate = surrogate
+		self.surrogates = dict()
+		# Fitness of the configurations already evaluated, shared by the search processes (set up by search)
+		self.fitness_cache = None
+		# Fitness of the partitions already scored by this process, whatever configuration produced them
+		self.labeling_cache = LabelingCache()
+		# Fitted states of this process that the offspring of evaluated individuals are warm started from
+		self.warm_starts = WarmStarts()
+
 		# Creator: Assign Fitness Function (eg. multi-objective)
 		fitness_weights = (np.float(self.cvi[0][1]), np.float(self.cvi[1][1]), np.float(self.cvi[2][1]))
 		creator.create("FitnessMulti", base.Fitness, weights=fitness_weights)
@@ -160,73 +217,323 @@ class CSmartML:
 	# Assign EA or Random Search for hyper-partitions
 	def search(self, publish):
 		publish({"label": "Initializing search, creating processes..."}, "message")
-		func_dict = dict()
-		# Run parallel if more than 1 hyper-partition
-		if len(self.partitions) > 1:
-			for key, value in self.partitions.items():
-				population = self.toolbox[key].population(n=self.pop_size)
-				if len(value) > 1:
-					func_dict['ea_custom-' + key] = [key, self.time, population, self.toolbox[key], 0.7, 0.3, publish]
-				else:
-					func_dict['random_search-' + key] = [key, self.time, self.pop_size, population, self.toolbox[key], publish]
-
-		results = self.parallel_search(func_dict)
-
-		publish({"label": "Getting final solutions..."}, "message")
-
-		pop = list()
+		manager = multiprocessing.Manager()
+		self.fitness_cache = FitnessCache(manager)
+		if self.evaluation_store is not None:
+			self.fitness_cache.entries.update(self.evaluation_store.fitness())
+		# Every partition submits its evaluations to the same pool of workers
+		scheduler = Scheduler(self.evaluate_individual, list(self.partitions), self.workers, lookup=self.cached_fitness,
+							  key=self.fitness_key, store=self.store_fitness)
+		try:
+			func_dict = dict()
+			# Run parallel if more than 1 hyper-partition
+			if len(self.partitions) > 1:
+				for key, value in self.partitions.items():
+					population = self.toolbox[key].population(n=self.pop_size)
+					self.seed_population(population, value)
+					if self.fidelities:
+						self.toolbox[key].register("map", self.fidelity_mapper(scheduler, key))
+					else:
+						self.toolbox[key].register("map", scheduler.mapper(key))
+					if self.surrogate:
+						self.surrogates[key] = Surrogate(value, creator.FitnessMulti.weights)
+						self.toolbox[key].register("map", self.surrogate_mapper(self.surrogates[key], self.toolbox[key].map))
+					if len(value) > 1:
+						func_dict['ea_custom-' + key] = [key, self.time, population, self.toolbox[key], 0.7, 0.3, publish]
+					else:
+						func_dict['random_search-' + key] = [key, self.time, self.pop_size, population, self.toolbox[key], publish]
+
+			scheduler.start()
+			if self.racing and len(func_dict) > 1:
+				results = self.race(func_dict, scheduler, publish)
+			else:
+				# Evaluations still running when the time budget is spent are cancelled
+				scheduler.budget(self.time)
+				results = self.parallel_search(func_dict, scheduler)
+			scheduler.close()
+			if scheduler.cancelled > 0:
+				publish({"label": "{} evaluations cancelled at the time budget...".format(scheduler.cancelled)}, "message")
+			if scheduler.timeouts.value > 0:
+				publish({"label": "{} evaluations stopped at their time limit...".format(scheduler.timeouts.value)}, "message")
+			screened = sum(surrogate.screened for surrogate in self.surrogates.values())
+			if screened > 0:
+				publish({"label": "{} offspring skipped by the surrogate model...".format(screened)}, "message")
+
+			publish({"label": "Getting final solutions..."}, "message")
+
+			# A store that cannot be written must not cost the results of the search
+			if self.evaluation_store is not None:
+				try:
+					self.store_evaluations(results)
+				except Exception as e:
+					print(e)
+
+			pop = list()
+			for key, values in results.items():
+				index = 0
+				for value in values:
+					if index < 10:
+						pop.append(value)
+						index += 1
+
+			# Sampled fitness only guides the search: rescore the final candidates exactly before selecting the results
+			if self.sample_size is not None:
+				publish({"label": "Rescoring final solutions..."}, "message")
+				pop = self.main_toolbox.select(pop, 10)
+				for ind in pop:
+					ind.fitness.values = self.fitness_function(ind, exact=True)
+
+			if self.resultPreference == "multi":
+				results = self.main_toolbox.select(pop, 10)
+			else:
+				results = self.main_toolbox.select(pop, 1)
+			# results = pop
+			results = self.refit_results(results)
+
+			report = self.fitness_cache.report()
+			print(report)
+			publish({"label": report}, "message")
+
+			publish({"label": "Preparing charts..."}, "message")
+
+			# Include NSGA2 Select for results on Fitness Function
+			return results, self.algorithm
+		finally:
+			# Remove the shared files even when the search fails or is interrupted
+			scheduler.close()
+			self.fitness_cache = None
+			self.close_shared_data()
+
+	# Fit the final individuals once more in this process and score those fits, so that the labels returned with every
+	# individual (ind.labels) are the ones its fitness describes; individuals whose fit fails are left out
+	def refit_results(self, results):
+		refitted = list()
+		for ind in results:
+			try:
+				ind.labels = self.fit_estimator(clone(ind[0]))
+			except Exception as e:
+				print(e)
+				continue
+			ind.fitness.values = self.score_labels(canonical_labels(ind.labels))
+			refitted.append(ind)
+		return self.main_toolbox.select(refitted, len(refitted))
+
+	# Remove the files of the shared dataset and caches; processes that mapped them keep their view
+	def close_shared_data(self):
+		if self.distance_cache is not None:
+			self.distance_cache.close()
+		if self.similarity_cache is not None:
+			self.similarity_cache.close()
+		self.shared_data.unlink()
+
+	# Replace up to half of a new population with the best stored individuals of its hyper-partition
+	def seed_population(self, population, partition):
+		if self.evaluation_store is None:
+			return
+
+		seeds = list()
+		for estimator, fitness in self.evaluation_store.individuals("_&_".join(partition)):
+			if fitness != (0, 0, 0):
+				individual = creator.Individual([estimator])
+				individual.fitness.values = fitness
+				seeds.append(individual)
+
+		seeds = self.main_toolbox.select(seeds, min(len(seeds), len(population) // 2))
+		population[:len(seeds)] = seeds
+
+	# Save every evaluated configuration, and the final individuals of each hyper-partition to seed later runs
+	def store_evaluations(self, results):
+		individuals = list()
 		for key, values in results.items():
-			index = 0
-			for value in values:
-				if index < 10:
-					pop.append(value)
-					index += 1
-
-		if self.resultPreference == "multi":
-			results = self.main_toolbox.select(pop, 10)
-		else:
-			results = self.main_toolbox.select(pop, 1)
-		# results = pop
+			partition = "_&_".join(self.partitions[key])
+			for ind in values:
+				config = self.fitness_cache.key(ind[0], self.sample_size)
+				individuals.append((partition, config, clone(ind[0]), ind.fitness.values))
 
-		publish({"label": "Preparing charts..."}, "message")
+		self.evaluation_store.save(dict(self.fitness_cache.entries), individuals)
 
-		# Include NSGA2 Select for results on Fitness Function
-		return results, self.algorithm
-
-	# Create separate process for hyper-partition search
+	# Run the search loop of every hyper-partition in its own thread; the loops only select and vary,
+	# their evaluations run in the scheduler's worker processes
 	# Store all results in res
-	def parallel_search(self, partitions):
+	def parallel_search(self, partitions, scheduler, res=None):
 
-		manager = multiprocessing.Manager()
-		res = manager.dict()
-		process = []
+		if res is None:
+			res = dict()
+		threads = []
 
 		for partition in partitions:
 			func_name = partition.split("-")[0]
 			# func = getattr(sys.modules[__name__], func_name)
 			func = globals()[func_name]
-			partitions[partition].append(res)
-			p = Process(target=func, args=tuple(partitions[partition], ))
-			p.start()
-			process.append(p)
+			t = threading.Thread(target=func, args=tuple(partitions[partition]) + (res, ))
+			t.start()
+			threads.append(t)
 
-		for proc in process:
-			proc.join()
+		for thread in threads:
+			thread.join()
+
+		return res
+
+	# Successive halving over the hyper-partitions: the surviving partitions search for an equal share of the
+	# remaining budget, continuing from their populations, then only the better half by front hypervolume goes on
+	def race(self, partitions, scheduler, publish):
+
+		res = dict()
+		alive = list(partitions)
+		rungs = int(math.ceil(math.log2(len(alive)))) + 1
+		# Only the end of the whole budget cancels evaluations; a rung's generation in flight is completed
+		scheduler.budget(self.time)
+		end = scheduler.deadline
+
+		for rung in range(rungs):
+			budget = max(0, end - time.time()) / (rungs - rung)
+			rung_partitions = dict()
+			for partition in alive:
+				args = list(partitions[partition])
+				args[1] = budget
+				rung_partitions[partition] = args
+			self.parallel_search(rung_partitions, scheduler, res)
+
+			if rung < rungs - 1:
+				volumes = front_hypervolumes({partition: res[partitions[partition][0]] for partition in alive})
+				alive = sorted(alive, key=lambda partition: volumes[partition], reverse=True)[:(len(alive) + 1) // 2]
+				publish({"label": "Racing: {} hyper-partitions kept...".format(len(alive))}, "message")
 
 		return res
 
 	# Evaluate individual fitness
-	def fitness_function(self, individual):
+	# Pair-based metrics are estimated on subsamples when sample_size is set, unless exact
+	# Configurations evaluated before, by any search process, are read from the fitness cache
+	def fitness_function(self, individual, exact=False):
+		fitness = self.cached_fitness(individual, exact)
+		if fitness is None:
+			fitness = self.compute_fitness(individual, exact)
+		return fitness
+
+	# Fitness cache key of an individual, evaluated on the full dataset or on the subsample of a fidelity level
+	def fitness_key(self, individual, exact=False, level=None):
+		sample_size = None if exact else self.sample_size
+		if level is None:
+			return self.fitness_cache.key(individual[0], sample_size)
+		return self.fitness_cache.key(individual[0], sample_size, "fidelity", self.fidelities[level][0])
+
+	# Fitness of an individual from the fitness cache, None if not evaluated yet
+	def cached_fitness(self, individual, exact=False, level=None):
+		if self.fitness_cache is None:
+			return None
+		return self.fitness_cache.get(self.fitness_key(individual, exact, level))
+
+	# Evaluate an individual; the scheduler's workers run this and their results are cached by store_fitness
+	def evaluate_individual(self, individual, exact=False, level=None):
+		sample_size = None if exact else self.sample_size
+		return self.evaluate_estimator(individual[0], sample_size, level, getattr(individual, "parent", None))
+
+	# Add the fitness of an individual to the fitness cache
+	def store_fitness(self, individual, fitness, exact=False, level=None):
+		if self.fitness_cache is not None:
+			self.fitness_cache.put(self.fitness_key(individual, exact, level), fitness)
+
+	# Evaluate an individual and add its fitness to the fitness cache
+	def compute_fitness(self, individual, exact=False, level=None):
+		fitness = self.evaluate_individual(individual, exact, level)
+		self.store_fitness(individual, fitness, exact, level)
+		return fitness
+
+	# toolbox.map of a partition in multi-fidelity mode: the individuals are scored on the subsample of every
+	# fidelity level in turn, each level keeping its best fraction by NSGA2 rank, and the remaining ones on the full
+	# dataset. Screened out individuals get no fitness (None) and are dropped by the search loops.
+	def fidelity_mapper(self, scheduler, partition):
+		def fidelity_map(evaluate, individuals):
+			individuals = list(individuals)
+			fitnesses = [None] * len(individuals)
+			promoted = list(range(len(individuals)))
+			for level, (fraction, keep) in enumerate(self.fidelities):
+				scores = scheduler.map(partition, evaluate, [individuals[i] for i in promoted], False, level)
+				ranked = list()
+				for i, score in zip(promoted, scores):
+					if score is not None and score != PENALTY:
+						proxy = creator.Individual([i])
+						proxy.fitness.values = score
+						ranked.append(proxy)
+				chosen = sorted(proxy[0] for proxy in tools.selNSGA2(ranked, int(math.ceil(keep * len(ranked)))))
+				# Keep a population the variation operators can work with
+				if len(chosen) >= 2:
+					promoted = chosen
+
+			for i, fitness in zip(promoted, scheduler.map(partition, evaluate, [individuals[i] for i in promoted])):
+				fitnesses[i] = fitness
+			return fitnesses
+
+		return fidelity_map
+
+	# toolbox.map of a partition screened by its surrogate model: only the individuals the surrogate does not predict
+	# to be dominated are evaluated by evaluate_map, the others get no fitness (None) and are dropped by the search
+	# loops; the surrogate learns from every evaluated individual
+	def surrogate_mapper(self, surrogate, evaluate_map):
+		def surrogate_map(evaluate, individuals):
+			individuals = list(individuals)
+			fitnesses = [None] * len(individuals)
+			chosen = surrogate.screen([individual[0] for individual in individuals])
+			for i, fitness in zip(chosen, evaluate_map(evaluate, [individuals[i] for i in chosen])):
+				fitnesses[i] = fitness
+			surrogate.add([individuals[i][0] for i in chosen], [fitnesses[i] for i in chosen])
+			return fitnesses
+
+		return surrogate_map
+
+	# Fit an estimator and compute the metrics of its partition, unless the same partition was scored before
+	# level selects the subsample of a fidelity level instead of the full dataset
+	# parent is the estimator of the individual's parent, from whose fit a KMeans may be warm started
+	def evaluate_estimator(self, estimator, sample_size=None, level=None, parent=None):
 
 		try:
-			clustering = individual[0].fit(self.data)
-			labels = clustering.labels_
-			validate = Validation(np.asmatrix(self.data).astype(np.float), np.asarray(self.data), labels)
+			labels = canonical_labels(self.fit_estimator(estimator, level, parent))
+		except Exception as e:
+			print(e)
+			return PENALTY
+
+		key = self.labeling_cache.key(labels, sample_size, level)
+		fitness = self.labeling_cache.get(key)
+		if fitness is None:
+			fitness = self.score_labels(labels, sample_size, level)
+			self.labeling_cache.put(key, fitness)
+		return fitness
+
+	# Compute the metrics of a partition
+	def score_labels(self, labels, sample_size=None, level=None):
+
+		data, context = self.matrix, self.dataset_context
+		if level is not None:
+			data, context = self.fidelity_data[level], self.fidelity_contexts[level]
+		try:
+			validate = Validation(np.asmatrix(data), data, labels, dataset=context, sample_size=sample_size)
 			metric_values = validate.run_list([self.cvi[0][0], self.cvi[1][0], self.cvi[2][0]])
 			return metric_values[self.cvi[0][0]], metric_values[self.cvi[1][0]], metric_values[self.cvi[2][0]]
 		except Exception as e:
 			print(e)
-			return 0, 0, 0
+			return PENALTY
+
+	# Fit an individual's estimator and return its labels
+	# Estimators with a warm start reuse the earlier fits of this process (see WarmStarts)
+	# Affinity propagation reads the shared similarities and their median preference
+	def fit_estimator(self, estimator, level=None, parent=None):
+		data = self.matrix if level is None else self.fidelity_data[level]
+		labels = self.warm_starts.fit(estimator, data, level, parent=parent)
+		if labels is not None:
+			return labels
+
+		if level is not None:
+			return estimator.fit(data).labels_
+
+		params = estimator.get_params()
+		if self.similarity_cache is not None and isinstance(estimator, AffinityPropagation) and \
+				params["affinity"] == "euclidean":
+			preference = self.similarity_cache.preference if params["preference"] is None else params["preference"]
+			# copy stays on: the fit writes the preference and noise into its similarities
+			return clone(estimator).set_params(affinity="precomputed", preference=preference, copy=True) \
+				.fit(self.similarity_cache.array).labels_
+
+		return estimator.fit(self.matrix).labels_
 
 	# Evaluate individual fitness: pareto front & rank
 	# def fitness_function_mastered(self, population):
@@ -247,6 +554,32 @@ class CSmartML:
 			return self.model.mutate(individual)
 
 
+# Nested subsamples of a dataset holding the given fractions of it, stratified over a coarse k-means partition
+def fidelity_subsets(data, fractions, strata=8, seed=0):
+	if not fractions:
+		return []
+	rng = np.random.RandomState(seed)
+	groups = MiniBatchKMeans(n_clusters=min(strata, len(data)), random_state=seed, n_init=3).fit(data).labels_
+	members = [rng.permutation(np.flatnonzero(groups == group)) for group in np.unique(groups)]
+	return [np.sort(np.concatenate([m[:max(1, int(round(fraction * len(m))))] for m in members])) for fraction in fractions]
+
+
+# Hypervolume of the non-dominated front of every population, against a reference point shared by all of them
+# Failed evaluations and undefined fitness values are left out
+def front_hypervolumes(populations):
+	fronts = dict()
+	for key, population in populations.items():
+		valid = [ind for ind in population if ind.fitness.valid and ind.fitness.values != (0, 0, 0)
+				 and np.all(np.isfinite(ind.fitness.values))]
+		fronts[key] = tools.sortNondominated(valid, len(valid), first_front_only=True)[0] if valid else []
+
+	points = [ind.fitness.wvalues for front in fronts.values() for ind in front]
+	if not points:
+		return {key: 0.0 for key in fronts}
+	ref = np.max(np.array(points) * -1, axis=0) + 1
+	return {key: hypervolume(front, ref) if front else 0.0 for key, front in fronts.items()}
+
+
 # Random search for single hyper-parameter tuning
 def random_search(pid, t, s, population, toolbox, publish, res):
 
@@ -256,7 +589,10 @@ def random_search(pid, t, s, population, toolbox, publish, res):
 	invalid_ind = [ind for ind in population if not ind.fitness.valid]
 	fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
 	for ind, fit in zip(invalid_ind, fitnesses):
-		ind.fitness.values = fit
+		# Individuals screened out by multi-fidelity evaluation or cancelled at the deadline get no fitness and are dropped
+		if fit is not None:
+			ind.fitness.values = fit
+	population[:] = [ind for ind in population if ind.fitness.valid]
 
 	ngen = 0
 	while time.time() - start_time <= t:
@@ -279,6 +615,8 @@ def random_search(pid, t, s, population, toolbox, publish, res):
 		print("RS-PID: ", pid)
 
 		for ind, fit in zip(invalid_ind, fitnesses):
+			if fit is None:
+				continue
 			ind.fitness.values = fit
 
 			# Tuned parameter value, fitness value, current generation
@@ -293,7 +631,7 @@ def random_search(pid, t, s, population, toolbox, publish, res):
 		print(trial_log)
 		publish({"partition_live": [label, trial_log]}, "message")
 		# Replace the current population by the offspring
-		population[:] = offspring
+		population[:] = [ind for ind in offspring if ind.fitness.valid]
 
 		ngen += 1
 
@@ -303,14 +641,19 @@ def random_search(pid, t, s, population, toolbox, publish, res):
 # Custom Evolutionary Algorithm: With Time Budget
 def ea_custom(pid, t, population, toolbox, cxpb, mutpb, publish, res):
 
+	# The time budget includes the evaluation of the initial population
+	start_time = time.time()
+
 	# Evaluate the individuals with an invalid fitness
 	invalid_ind = [ind for ind in population if not ind.fitness.valid]
 	fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
 	for ind, fit in zip(invalid_ind, fitnesses):
-		ind.fitness.values = fit
+		# Individuals screened out by multi-fidelity evaluation or cancelled at the deadline get no fitness and are dropped
+		if fit is not None:
+			ind.fitness.values = fit
+	population[:] = [ind for ind in population if ind.fitness.valid]
 
 	# Begin the [TIMED] generational process
-	start_time = time.time()
 	ngen = 0
 
 	# Select the next generation individuals
@@ -336,6 +679,8 @@ def ea_custom(pid, t, population, toolbox, cxpb, mutpb, publish, res):
 		print("EA Label: ", label)
 
 		for ind, fit in zip(invalid_ind, fitnesses):
+			if fit is None:
+				continue
 			ind.fitness.values = fit
 
 			# Tuned parameter value, fitness value, current generation
@@ -348,6 +693,7 @@ def ea_custom(pid, t, population, toolbox, cxpb, mutpb, publish, res):
 
 		# Replace the current population by the offspring
 		# population[:] = offspring
+		offspring = [ind for ind in offspring if ind.fitness.valid]
 		population[:] = toolbox.select(population + offspring, 10)  # Mu plus lambda : ea
 
 	res.update({pid: population})
\ No newline at end of file
@@ -18,14 +18,672 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import math
-from scipy.spatial import distance
+import functools
+from scipy import stats
+from scipy.spatial import distance, cKDTree
 import numpy as np
-import itertools
 import re
 import warnings
 from sklearn import metrics
-from s_dbw import S_Dbw
-from .sdbw import sdbw
+
+# Number of pairwise distances held in memory at once by the tiled pair computations
+PAIR_BLOCK_ELEMENTS = 2 ** 22
+
+
+class DatasetContext:
+    """
+    DatasetContext holds the statistics of a dataset that do not depend on the solution, so that they are computed
+    once per dataset and shared by every Validation of a search instead of once per evaluated solution.
+
+    Parameters
+    ----------
+    data: matrix of floats
+        data matrix
+    distances: array of floats, optional
+        Precomputed pairwise distances of the data in condensed form, as returned by pdist (e.g. a shared
+        DistanceCache). If given, the pair-based indices read their distances from it instead of computing them.
+
+    Attributes
+    ----------
+    num_pairs: int
+        Number of pairs of objects
+    """
+
+    # Indices that count concordances against the sorted pairwise distances
+    CONCORDANCE_INDICES = ["baker_hubert_gamma", "tau_index", "g_plus_index"]
+
+    # Indices that read the prefix sums of the sorted pairwise distances
+    PREFIX_INDICES = ["c_index"]
+
+    def __init__(self, data, distances=None):
+        self.data = np.asarray(data, dtype=float)
+        self.distances = distances
+        self.num_pairs = len(self.data) * (len(self.data) - 1) // 2
+        self._sorted_distances = None
+        self._prefix = None
+
+    def precompute(self, cvi_list):
+        """
+        Compute the statistics needed by the indices in cvi_list ahead of time (e.g. before forking search processes)
+        """
+        if any(cvi in self.CONCORDANCE_INDICES for cvi in cvi_list):
+            self.sorted_distances()
+        if any(cvi in self.PREFIX_INDICES for cvi in cvi_list):
+            self.distance_prefix()
+
+    def _pair_distances(self):
+        """
+        The distances of all pairs of objects, sorted ascending
+        """
+        if self.distances is None:
+            pairs = distance.pdist(self.data)
+        else:
+            pairs = np.array(self.distances, dtype=float)
+        pairs.sort()
+        return pairs
+
+    def sorted_distances(self):
+        """
+        The distances of all pairs of objects, sorted ascending; kept for the concordance indices
+        """
+        if self._sorted_distances is None:
+            self._sorted_distances = self._pair_distances()
+        return self._sorted_distances
+
+    def distance_prefix(self):
+        """
+        Cumulative sums of the sorted distances, with prefix[m] the sum of the m smallest distances. The sorted
+        distances themselves are only kept if a concordance index already asked for them.
+        """
+        if self._prefix is None:
+            pairs = self._sorted_distances if self._sorted_distances is not None else self._pair_distances()
+            self._prefix = np.zeros(self.num_pairs + 1)
+            np.cumsum(pairs, out=self._prefix[1:])
+        return self._prefix
+
+    def distance_block(self, rows, cols):
+        """
+        The precomputed distances between the objects rows and the objects cols, as a len(rows) x len(cols) matrix
+        """
+        size = len(self.data)
+        first = np.minimum(rows[:, None], cols[None, :]).astype(np.int64)
+        second = np.maximum(rows[:, None], cols[None, :]).astype(np.int64)
+        # position of the pair (first, second), first < second, in the condensed upper triangle
+        index = first * size - first * (first + 1) // 2 + second - first - 1
+        diagonal = first == second
+        block = np.asarray(self.distances[np.where(diagonal, 0, index)], dtype=float)
+        block[diagonal] = 0
+        return block
+
+    def smallest_sum(self, m):
+        """
+        Sum of the m smallest pairwise distances
+        """
+        return self.distance_prefix()[m]
+
+    def largest_sum(self, m):
+        """
+        Sum of the m largest pairwise distances
+        """
+        prefix = self.distance_prefix()
+        return prefix[self.num_pairs] - prefix[self.num_pairs - m]
+
+
+class ClusterContext:
+    """
+    ClusterContext holds the per-labeling cluster statistics shared by the validation indices, so that a set of
+    indices evaluated on the same solution only has to group the objects and compute the centroids once.
+    Clusters are the labels 0..max(labels); objects with a negative label (noise) belong to no cluster, but are
+    still part of the dataset center.
+
+    Parameters
+    ----------
+    data: matrix of floats
+        data matrix
+    labels: list of ints
+        The solution labels
+    block_elements: int, optional
+        Number of pairwise distances held in memory at once by the pair computations (PAIR_BLOCK_ELEMENTS by default)
+    dataset: DatasetContext, optional
+        The statistics of the dataset shared across solutions; a private one is created if not given
+
+    Attributes
+    ----------
+    order: array of ints
+        Object indices sorted by cluster label (stable, so members keep their original order)
+    bounds: array of ints
+        Members of cluster i are order[bounds[i]:bounds[i + 1]]
+    sorted_labels: array of ints
+        The labels in the order of order
+    sizes: array of ints
+        Number of members of every cluster
+    centers: array of floats
+        Cluster centroids, one row per cluster
+    data_center: array of floats
+        Center of the whole dataset
+    member_dis: array of floats
+        Distance of every object to its cluster center (NaN for noise)
+    center_dis: array of floats
+        Distance of every object to the dataset center
+    radius: array of floats
+        Largest distance of a member to its cluster center, per cluster
+    sse: array of floats
+        Sum of squared distances of the members to their cluster center, per cluster
+    norm_sum: array of floats
+        Sum of distances of the members to their cluster center, per cluster
+    num_pairs, num_within, num_between: ints
+        Number of pairs of objects in the dataset, in the same cluster and not in the same cluster
+
+    """
+
+    def __init__(self, data, labels, block_elements=None, dataset=None):
+        self.data = np.asarray(data, dtype=float)
+        self.labels = np.asarray(labels, dtype=int)
+        self.dataset = dataset if dataset is not None else DatasetContext(self.data)
+        self.num_obj, self.attributes = self.data.shape
+        self.num_cluster = int(self.labels.max()) + 1
+
+        # group the objects by label once
+        self.order = np.argsort(self.labels, kind='mergesort')
+        self.bounds = np.searchsorted(self.labels[self.order], np.arange(self.num_cluster + 1))
+        self.sizes = np.diff(self.bounds)
+        self.clustered = self.order[self.bounds[0]:]
+        self.sorted_labels = self.labels[self.order]
+        self.block_elements = block_elements or PAIR_BLOCK_ELEMENTS
+
+        # compute the centers of the clusters and of the dataset
+        members = self.data[self.clustered]
+        self.centers = np.full((self.num_cluster, self.attributes), np.nan)
+        filled = self.sizes > 0
+        if filled.any():
+            sums = np.add.reduceat(members, self.bounds[:-1][filled] - self.bounds[0], axis=0)
+            self.centers[filled] = sums / self.sizes[filled, None]
+        self.data_center = np.mean(self.data, 0)
+
+        # distance of every member to its own center and to the dataset center
+        self.member_dis = np.full(self.num_obj, np.nan)
+        diff = members - self.centers[self.labels[self.clustered]]
+        squared = np.einsum('ij,ij->i', diff, diff)
+        self.member_dis[self.clustered] = np.sqrt(squared)
+        self.center_dis = np.linalg.norm(self.data - self.data_center, axis=1)
+
+        cluster_of = self.labels[self.clustered]
+        self.sse = np.bincount(cluster_of, weights=squared, minlength=self.num_cluster)
+        self.norm_sum = np.bincount(cluster_of, weights=self.member_dis[self.clustered], minlength=self.num_cluster)
+        self.radius = np.zeros(self.num_cluster)
+        np.maximum.at(self.radius, cluster_of, self.member_dis[self.clustered])
+
+        # number of pairs of objects, in total and within the same cluster
+        self.num_pairs = self.num_obj * (self.num_obj - 1) // 2
+        self.num_within = int(np.sum(self.sizes * (self.sizes - 1) // 2))
+        self.num_between = self.num_pairs - self.num_within
+        self._nearest_other = None
+        self._concordance = {}
+        self._within_sums = None
+        self._scatter = None
+        self._bound = None
+        self._diameters = {}
+        self._min_separation = None
+        self._pair_stats = None
+
+    def members(self, i):
+        """
+        Indices of the objects in cluster i
+        """
+        return self.order[self.bounds[i]:self.bounds[i + 1]]
+
+    def center_distances(self):
+        """
+        Pairwise distances between the cluster centers, as a square matrix
+        """
+        return distance.squareform(distance.pdist(self.centers))
+
+    def nearest_other_center(self, chunk_size=4096):
+        """
+        Distance of every clustered object to the closest center of another cluster, in the order of self.clustered.
+        Computed in chunks so that only chunk_size x num_cluster distances are held at once.
+        """
+        if self._nearest_other is None:
+            cluster_of = self.labels[self.clustered]
+            nearest = np.empty(len(self.clustered))
+            for start in range(0, len(self.clustered), chunk_size):
+                stop = start + chunk_size
+                dis = distance.cdist(self.data[self.clustered[start:stop]], self.centers)
+                dis[np.arange(len(dis)), cluster_of[start:stop]] = np.inf
+                nearest[start:stop] = dis.min(axis=1)
+            self._nearest_other = nearest
+        return self._nearest_other
+
+    def max_diameter(self, approximate=None):
+        """
+        The largest cluster diameter. A cluster's diameter lies between its radius and twice its radius, so the
+        clusters are visited by decreasing radius and the search stops as soon as no remaining cluster can exceed
+        the largest diameter found; each diameter is computed at most once. Clusters with more than approximate
+        members use the double-sweep estimate of their diameter.
+        """
+        largest = 0.0
+        for i in np.argsort(-self.radius, kind='mergesort'):
+            if 2 * self.radius[i] <= largest:
+                break
+            key = (i, approximate is not None and self.sizes[i] > approximate)
+            if key not in self._diameters:
+                self._diameters[key] = self._sweep_diameter(i) if key[1] else self._diameter(i)
+            largest = max(largest, self._diameters[key])
+        return largest
+
+    def _diameter(self, i):
+        """
+        The largest distance between two members of cluster i, over row tiles of their distance matrix
+        """
+        members = self.members(i)
+        rows = max(1, self.block_elements // len(members))
+        diameter = 0.0
+        for start in range(0, len(members), rows):
+            chunk = members[start:start + rows]
+            if self.dataset.distances is not None:
+                dis = self.dataset.distance_block(chunk, members)
+            else:
+                dis = distance.cdist(self.data[chunk], self.data[members])
+            diameter = max(diameter, np.max(dis))
+        return diameter
+
+    def _sweep_diameter(self, i, sweeps=3):
+        """
+        Lower estimate of the diameter of cluster i: starting from the member farthest from the center, jump to the
+        member farthest from the current one a few times. It is never below the cluster radius.
+        """
+        members = self.members(i)
+        points = self.data[members]
+        current = points[np.argmax(self.member_dis[members])]
+        diameter = self.radius[i]
+        for _ in range(sweeps):
+            dis = distance.cdist(current[None, :], points)[0]
+            far = np.argmax(dis)
+            if dis[far] <= diameter:
+                break
+            diameter = dis[far]
+            current = points[far]
+        return diameter
+
+    def min_separation(self):
+        """
+        The smallest distance between two objects of different clusters. Pairs of clusters are visited by
+        increasing lower bound (center distance minus both radii) and skipped once the bound reaches the smallest
+        distance found; the members of the smaller cluster then query a KD-tree of the larger one.
+        """
+        if self._min_separation is None:
+            filled = np.flatnonzero(self.sizes)
+            trees = {}
+            first, second = np.triu_indices(len(filled), 1)
+            first, second = filled[first], filled[second]
+            centerDis = np.linalg.norm(self.centers[first] - self.centers[second], axis=1)
+            bound = centerDis - self.radius[first] - self.radius[second]
+            smallest = np.inf
+            for p in np.argsort(bound, kind='mergesort'):
+                if bound[p] >= smallest:
+                    break
+                small, large = sorted((first[p], second[p]), key=lambda c: self.sizes[c])
+                if large not in trees:
+                    trees[large] = cKDTree(self.data[self.members(large)])
+                dis, _ = trees[large].query(self.data[self.members(small)], k=1, distance_upper_bound=smallest)
+                smallest = min(smallest, np.min(dis))
+            self._min_separation = smallest
+        return self._min_separation
+
+    def scatter(self):
+        """
+        The scatter matrices of the solution, computed once with segment sums over the labels. See Scatter.
+        """
+        if self._scatter is None:
+            k, d = self.num_cluster, self.attributes
+            scatter = Scatter(k, d)
+            cluster_of = self.labels[self.clustered]
+            centered = self.data[self.clustered] - self.centers[cluster_of]
+            # within-group scatter matrix of every cluster, one attribute pair at a time
+            for i in range(d):
+                for j in range(i, d):
+                    entry = np.bincount(cluster_of, weights=centered[:, i] * centered[:, j], minlength=k)
+                    scatter.cluster_within[:, i, j] = entry
+                    scatter.cluster_within[:, j, i] = entry
+            scatter.within = np.sum(scatter.cluster_within, axis=0)
+            # between-group scatter matrix, from the cluster centers weighted by the cluster sizes
+            deviation = self.centers - self.data_center
+            scatter.between = np.dot(deviation.T * self.sizes, deviation)
+            scatter.center_scatter = np.dot(deviation.T, deviation)
+            # total scatter matrix of the dataset
+            total = self.data - self.data_center
+            scatter.total = np.dot(total.T, total)
+            self._scatter = scatter
+        return self._scatter
+
+    def bind_noise(self):
+        """
+        The context of the solution where every noise object joins the cluster of its nearest clustered object
+        (the first one in data order on ties); the context itself if there is no noise
+        """
+        if self._bound is None:
+            noise = np.flatnonzero(self.labels < 0)
+            if len(noise) == 0 or len(noise) == self.num_obj:
+                self._bound = self
+            else:
+                clustered = np.sort(self.clustered)
+                labels = self.labels.copy()
+                rows = max(1, self.block_elements // len(clustered))
+                for start in range(0, len(noise), rows):
+                    chunk = noise[start:start + rows]
+                    if self.dataset.distances is not None:
+                        dis = self.dataset.distance_block(chunk, clustered)
+                    else:
+                        dis = distance.cdist(self.data[chunk], self.data[clustered])
+                    labels[chunk] = self.labels[clustered[np.argmin(dis, axis=1)]]
+                self._bound = ClusterContext(self.data, labels, self.block_elements, self.dataset)
+        return self._bound
+
+    def representatives(self):
+        """
+        The member closest to the centroid of every cluster (the first one in data order on ties; NaN for empty
+        clusters)
+        """
+        represent = np.full((self.num_cluster, self.attributes), np.nan)
+        start = self.bounds[0]
+        cluster_of = self.sorted_labels[start:]
+        # lexsort is stable, so the first member of every cluster is its closest one, earliest on ties
+        closest = np.lexsort((self.member_dis[self.clustered], cluster_of))
+        first = np.searchsorted(cluster_of[closest], np.flatnonzero(self.sizes))
+        represent[self.sizes > 0] = self.data[self.clustered[closest[first]]]
+        return represent
+
+    def pair_blocks(self):
+        """
+        The pairwise distance engine: iterate over the upper triangle of the pairwise distance matrix of the objects
+        in label-sorted order (self.order), in row tiles of about block_elements distances. See _upper_tiles.
+        Yields (start, stop, block), where block[r, c] is the distance between sorted objects start + r and
+        start + c for c > r, and 0 on and below the diagonal.
+        """
+        if self.dataset.distances is not None:
+            return _matrix_tiles(self.dataset, self.order, self.block_elements)
+        return _upper_tiles(self.data[self.order], self.block_elements)
+
+    def within_blocks(self, i, exact=False):
+        """
+        Same tiles as pair_blocks for the members of cluster i only
+        """
+        if self.dataset.distances is not None:
+            return _matrix_tiles(self.dataset, self.members(i), self.block_elements)
+        return _upper_tiles(self.data[self.members(i)], self.block_elements, exact)
+
+    def within_sums(self):
+        """
+        Sum of the distances between members of the same cluster, per cluster. Computed cluster by cluster, so the
+        cost is proportional to the number of within-cluster pairs rather than to all pairs.
+        """
+        if self._within_sums is None:
+            self._within_sums = np.zeros(self.num_cluster)
+            for i in np.flatnonzero(self.sizes > 1):
+                for start, stop, block in self.within_blocks(i):
+                    self._within_sums[i] += np.sum(block)
+        return self._within_sums
+
+    def _block_masks(self, start, stop):
+        """
+        Masks of a tile from pair_blocks: pairs above the diagonal, and among those the pairs of objects in the
+        same cluster and in two different clusters (noise objects belong to neither)
+        """
+        rows = self.sorted_labels[start:stop, None]
+        cols = self.sorted_labels[None, start:]
+        upper = np.arange(start, self.num_obj)[None, :] > np.arange(start, stop)[:, None]
+        clustered = (rows >= 0) & (cols >= 0) & upper
+        same = rows == cols
+        return upper, clustered & same, clustered & ~same
+
+    def pair_stats(self):
+        """
+        Within-cluster and between-cluster distance statistics of the solution, computed in one pass of pair_blocks
+        and shared by the pair-based indices. See PairStats.
+        """
+        if self._pair_stats is None:
+            k = self.num_cluster
+            stats = PairStats(k)
+            for start, stop, block in self.pair_blocks():
+                upper, within, between = self._block_masks(start, stop)
+                rows = self.sorted_labels[start:stop]
+                row_clustered = rows >= 0
+
+                # within-cluster sum, per cluster of the row
+                inner = np.where(within, block, 0)
+                stats.within_sum += np.bincount(rows[row_clustered], weights=inner.sum(1)[row_clustered], minlength=k)
+
+                # between-cluster sum
+                stats.between_sum += np.sum(np.where(between, block, 0))
+
+            stats.within_count = self.num_within
+            clustered = np.sum(self.sizes)
+            stats.between_count = int((clustered * clustered - np.sum(self.sizes * self.sizes)) // 2)
+            self._pair_stats = stats
+        return self._pair_stats
+
+    def concordance(self, max_pairs=None, random_state=None):
+        """
+        Concordance counts of the within-cluster and between-cluster pair distances, used by the Gamma, Tau and
+        G_plus indices. s_plus is the number of (within, between) comparisons where the within-cluster distance is
+        smaller, s_minus where it is larger; ties count for neither.
+
+        Instead of comparing every pair of pairs, the W within-cluster distances are sorted and counted against the
+        dataset's sorted distances with searchsorted, which is O(W log n). The between-cluster counts are those of
+        all pairs minus those of the within-cluster pairs.
+        If max_pairs is set and the dataset has more pairs, the counts are estimated from max_pairs randomly
+        sampled pairs and scaled up to the number of comparisons of the full dataset.
+
+        Returns (s_plus, s_minus)
+        """
+        key = (max_pairs, random_state)
+        if key not in self._concordance:
+            if max_pairs is not None and self.num_pairs > max_pairs:
+                self._concordance[key] = self._sampled_concordance(max_pairs, random_state)
+            else:
+                # the within-cluster distances are gathered cluster by cluster, exactly as the dataset's sorted
+                # distances are computed so that equal distances tie
+                within = [_upper(start, stop, block) for i in np.flatnonzero(self.sizes > 1)
+                          for start, stop, block in self.within_blocks(i, True)]
+                within = np.sort(np.concatenate(within)) if within else np.empty(0)
+                self._concordance[key] = _count_concordance(within, self.dataset.sorted_distances())
+        return self._concordance[key]
+
+    def _sampled_concordance(self, max_pairs, random_state):
+        rng = np.random.RandomState(random_state)
+        first = rng.randint(0, self.num_obj, max_pairs)
+        second = rng.randint(0, self.num_obj, max_pairs)
+        distinct = first != second
+        first, second = first[distinct], second[distinct]
+
+        pair_dis = np.linalg.norm(self.data[first] - self.data[second], axis=1)
+        same = (self.labels[first] == self.labels[second]) & (self.labels[first] >= 0)
+        within = np.sort(pair_dis[same])
+        pairs = np.sort(pair_dis)
+        splus, sminus = _count_concordance(within, pairs)
+
+        # scale the sampled comparisons up to the comparisons of the whole dataset
+        sampled = len(within) * (len(pairs) - len(within))
+        if sampled == 0:
+            return 0, 0
+        scale = self.num_within * self.num_between / sampled
+        return splus * scale, sminus * scale
+
+
+class Scatter:
+    """
+    Scatter matrices of a solution, computed by ClusterContext.scatter
+
+    Attributes
+    ----------
+    cluster_within: array of floats
+        Within-group scatter matrix of every cluster (num_cluster x attributes x attributes)
+    within: matrix of floats
+        Within-group scatter matrix WG, the sum of the cluster matrices
+    between: matrix of floats
+        Between-group scatter matrix BG
+    center_scatter: matrix of floats
+        Scatter matrix of the cluster centers around the dataset center, not weighted by the cluster sizes
+    total: matrix of floats
+        Scatter matrix of the whole dataset
+    """
+
+    def __init__(self, num_cluster, attributes):
+        self.cluster_within = np.zeros((num_cluster, attributes, attributes))
+        self.within = np.zeros((attributes, attributes))
+        self.between = np.zeros((attributes, attributes))
+        self.center_scatter = np.zeros((attributes, attributes))
+        self.total = np.zeros((attributes, attributes))
+
+
+class PairStats:
+    """
+    Pairwise distance statistics of a solution, computed by ClusterContext.pair_stats
+
+    Attributes
+    ----------
+    within_sum: array of floats
+        Sum of the distances between members of the same cluster, per cluster
+    within_count: int
+        Number of pairs of objects in the same cluster
+    between_sum: float
+        Sum of the distances between objects of two different clusters
+    between_count: int
+        Number of pairs of objects in two different clusters
+
+    Pairs with a noise object are counted in neither.
+    """
+
+    def __init__(self, num_cluster):
+        self.within_sum = np.zeros(num_cluster)
+        self.within_count = 0
+        self.between_sum = 0.0
+        self.between_count = 0
+
+
+def _upper_tiles(x, block_elements, exact=False):
+    """
+    Iterate over the upper triangle of the pairwise distance matrix of the rows of x, in row tiles of about
+    block_elements distances. Distances are computed with the squared-Euclidean GEMM expansion
+    |x|^2 + |y|^2 - 2 x.y on the centered rows, or with cdist if exact is set (for the rank-based indices, where
+    rounding would break ties between equal distances).
+    Yields (start, stop, block), where block[r, c] is the distance between rows start + r and start + c for c > r,
+    and 0 on and below the diagonal.
+    """
+    if not exact:
+        x = x - np.mean(x, 0)
+        norms = np.einsum('ij,ij->i', x, x)
+    size = len(x)
+    rows = max(1, block_elements // max(1, size))
+    for start in range(0, size, rows):
+        stop = min(start + rows, size)
+        if exact:
+            block = distance.cdist(x[start:stop], x[start:])
+        else:
+            block = np.dot(x[start:stop], x[start:].T)
+            block *= -2
+            block += norms[start:stop, None]
+            block += norms[None, start:]
+            np.maximum(block, 0, out=block)
+            np.sqrt(block, out=block)
+        block[:, :stop - start] = np.triu(block[:, :stop - start], 1)
+        yield start, stop, block
+
+
+def _matrix_tiles(dataset, index, block_elements):
+    """
+    Same tiles as _upper_tiles for the objects index, read from the precomputed distances of a DatasetContext
+    """
+    size = len(index)
+    rows = max(1, block_elements // max(1, size))
+    for start in range(0, size, rows):
+        stop = min(start + rows, size)
+        block = dataset.distance_block(index[start:stop], index[start:])
+        block[:, :stop - start] = np.triu(block[:, :stop - start], 1)
+        yield start, stop, block
+
+
+def _upper(start, stop, block):
+    """
+    The distances above the diagonal of a tile, as a flat array
+    """
+    return block[np.arange(start, start + block.shape[1])[None, :] > np.arange(start, stop)[:, None]]
+
+
+def _count_concordance(within, pairs):
+    """
+    Concordance counts of the sorted within-cluster distances against the between-cluster distances, where the
+    between-cluster distances are the sorted distances of all pairs (pairs) without the within-cluster ones
+    """
+    # distances smaller / larger than each within-cluster distance
+    smaller = np.searchsorted(pairs, within, side='left') - np.searchsorted(within, within, side='left')
+    larger = (len(pairs) - np.searchsorted(pairs, within, side='right')) - \
+             (len(within) - np.searchsorted(within, within, side='right'))
+    return int(np.sum(larger, dtype=np.int64)), int(np.sum(smaller, dtype=np.int64))
+
+
+def _stratified_sample(ctx, sample_size, rng):
+    """
+    Indices, in data order, of a subsample of about sample_size objects drawn without replacement from every cluster
+    and from the noise in proportion to their sizes, keeping at least two members of every cluster
+    """
+    fraction = sample_size / ctx.num_obj
+    strata = [(ctx.order[:ctx.bounds[0]], 0)] + [(ctx.members(i), 2) for i in range(ctx.num_cluster)]
+    picks = []
+    for members, least in strata:
+        take = min(len(members), max(least, int(round(fraction * len(members)))))
+        if take > 0:
+            picks.append(rng.choice(members, take, replace=False))
+    return np.sort(np.concatenate(picks))
+
+
+def _samples(validation):
+    """
+    The Validations of the stratified subsamples used by the estimates of a Validation, drawn once and shared by
+    every index
+    """
+    if validation._samples is None:
+        ctx = validation.context
+        rng = np.random.RandomState(validation.random_state)
+        validation._samples = []
+        for _ in range(validation.sample_repeats):
+            keep = _stratified_sample(ctx, validation.sample_size, rng)
+            distances = None
+            if ctx.dataset.distances is not None:
+                distances = distance.squareform(ctx.dataset.distance_block(keep, keep), checks=False)
+            validation._samples.append(Validation(np.asmatrix(ctx.data[keep]), np.asarray(validation.data_raw)[keep],
+                                                  ctx.labels[keep], validation.max_pairs, validation.random_state,
+                                                  validation.block_elements, DatasetContext(ctx.data[keep], distances)))
+    return validation._samples
+
+
+def sampled(index):
+    """
+    Decorator of the pair-based indices. When the Validation has a sample_size smaller than the dataset, the index is
+    the mean of its values over sample_repeats stratified subsamples, and the Student-t interval of that mean over the
+    repeats is stored in intervals; otherwise it is computed exactly.
+    The interval only reflects the variance between subsamples: it is not a confidence interval of the index on the
+    full data, from which the subsample estimates of pair-based indices can be biased.
+    """
+    @functools.wraps(index)
+    def estimate(self):
+        ctx = self.context
+        if self.sample_size is None or ctx.num_obj <= self.sample_size:
+            self.intervals.pop(index.__name__, None)
+            return index(self)
+        values = []
+        for sample in _samples(self):
+            values.append(index(sample))
+            self.description = sample.description
+        mean = np.mean(values)
+        half = 0.0
+        if len(values) > 1:
+            quantile = stats.t.ppf((1 + self.confidence) / 2, len(values) - 1)
+            half = quantile * np.std(values, ddof=1) / math.sqrt(len(values))
+        self.intervals[index.__name__] = (mean - half, mean + half)
+        self.validation = mean
+        return self.validation
+    return estimate
 
 
 class Validation:
@@ -41,23 +699,66 @@ class Validation:
         data matrix
     labels: list of ints
         The solution labels
+    max_pairs: int, optional
+        If set, the rank-based indices (Gamma, Tau, G_plus) are estimated from this many sampled pairs of objects
+        when the dataset has more pairs
+    random_state: int, optional
+        Seed of the pair sampling
+    block_elements: int, optional
+        Number of pairwise distances held in memory at once by the pair computations
+    dataset: DatasetContext, optional
+        Statistics of the dataset shared by all the solutions of a search
+    approximate_diameter: int, optional
+        If set, Dunn's index estimates the diameter of the clusters with more members than this instead of computing
+        all their pairwise distances
+    sample_size: int, optional
+        If set and smaller than the dataset, the pair-based indices are estimated on stratified subsamples of about
+        this many objects
+    sample_repeats: int, optional
+        Number of subsamples averaged by the estimates (5 by default)
+    confidence: float, optional
+        Level of the Student-t intervals of the estimates over the repeats (0.95 by default)
 
     Attributes
     ----------
     validation: float
         Validation metric. NaN if error
+    intervals: dict
+        Interval (low, high) of the mean over the repeats of every index estimated on subsamples; it measures the
+        spread between subsamples, not the error against the index on the full data
     description: string
         A description of the validation metric
 
     """
 
-    def __init__(self, data, data_raw, labels):
+    def __init__(self, data, data_raw, labels, max_pairs=None, random_state=None, block_elements=None, dataset=None,
+                 approximate_diameter=None, sample_size=None, sample_repeats=5, confidence=0.95):
         self.data_matrix = data
         self.data_raw = data_raw
         self.class_label = labels
         # self.cluster_centers_ = centers
+        self.max_pairs = max_pairs
+        self.random_state = random_state
+        self.block_elements = block_elements
+        self.dataset = dataset
+        self.approximate_diameter = approximate_diameter
+        self.sample_size = sample_size
+        self.sample_repeats = sample_repeats
+        self.confidence = confidence
+        self.intervals = {}
         self.validation = np.nan
         self.description = ''
+        self._context = None
+        self._samples = None
+
+    @property
+    def context(self):
+        """
+        The ClusterContext of the solution, built on first use and shared by every index computed on it
+        """
+        if self._context is None:
+            self._context = ClusterContext(self.data_matrix, self.class_label, self.block_elements, self.dataset)
+        return self._context
 
     def validation_metrics_available(self):
         """
@@ -76,27 +777,10 @@ class Validation:
         Ball-Hall Index is the mean of the mean dispersion across all clusters
         """
         self.description = 'Mean of the mean dispersions across all clusters'
-        sum_total = 0
-
-        num_cluster = len(np.unique(self.class_label))
-
-        # iterate through all the clusters
-        for i in range(num_cluster):
-
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            cluster_member = self.data_matrix[indices, :]
-
-            # compute the center of the cluster
-            cluster_center = np.mean(cluster_member, axis=0)
-
-            sum_dis = 0
-            # iterate through all the members
-            for member in cluster_member:
-                sum_dis += distance.euclidean(member, cluster_center) ** 2
-            sum_total += sum_dis / len(indices)
+        ctx = self.context
 
         # compute the validation
-        self.validation = sum_total / num_cluster
+        self.validation = np.sum(ctx.sse / ctx.sizes) / ctx.num_cluster
         return self.validation
 
     def banfeld_raferty(self):
@@ -104,37 +788,20 @@ class Validation:
          of the traces of the variance-covariance matrix of each cluster
         """
         self.description = 'Weighted sum of the logarithms of the traces of the variance-covariance matrix of each cluster'
-        sum_total = 0
-        num_cluster = max(self.class_label) + 1
-
-        # iterate through all the clusters
-        for i in range(num_cluster):
-            sum_dis = 0
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            cluster_member = self.data_matrix[indices, :]
-
-            # compute the center of the cluster
-            cluster_center = np.mean(cluster_member, 0)
-
-            # iterate through all the members
-            for member in cluster_member:
-                sum_dis += distance.euclidean(member, cluster_center) ** 2
+        ctx = self.context
+        # the trace of a cluster's within-group scatter matrix is the sum of its squared deviations
+        traces = ctx.sse
 
-            try:
-                op = sum_dis / len(indices)
-                if op <= 0:
-                    # warnings.warn('Cannot calculate Banfeld_Raferty, due to an undefined value', UserWarning)
-                    continue
-                else:
-                    sum_total += len(indices) * math.log(sum_dis / len(indices))
-
-                # return the fitness
-                self.validation = sum_total
-            except:
-                continue
+        # clusters with an undefined trace (e.g. singletons) are skipped
+        with np.errstate(divide='ignore', invalid='ignore'):
+            op = traces / ctx.sizes
+        valid = op > 0
+        if valid.any():
+            self.validation = np.sum(ctx.sizes[valid] * np.log(op[valid]))
 
         return self.validation
 
+    @sampled
     def silhouette(self):
         """
         Silhouette: Compactness and connectedness combination that measures a ratio of within cluster distances to closest neighbors
@@ -150,36 +817,14 @@ class Validation:
         self.validation = metrics.calinski_harabasz_score(self.data_matrix, self.class_label)
         return self.validation
 
+    @sampled
     def baker_hubert_gamma(self):
         """
         Baker-Hubert Gamma Index: A measure of compactness, based on similarity between points in a cluster, compared to similarity
         with points in other clusters
         """
         self.description = 'Gamma Index: a measure of compactness'
-        splus = 0
-        sminus = 0
-        pairDis = distance.pdist(self.data_matrix)
-        numPair = len(pairDis)
-        temp = np.zeros((len(self.class_label), 2))
-        temp[:, 0] = self.class_label
-        vecB = distance.pdist(temp)
-        # iterate through all the pairwise comparisons
-        for i in range(numPair - 1):
-            for j in range(i + 1, numPair):
-                if vecB[i] > 0 and vecB[j] == 0:
-                    # heter points smaller than homo points
-                    if pairDis[i] < pairDis[j]:
-                        splus += 1
-                    # heter points larger than homo points
-                    if pairDis[i] > vecB[j]:
-                        sminus += 1
-                if vecB[i] == 0 and vecB[j] > 0:
-                    # heter points smaller than homo points
-                    if pairDis[j] < pairDis[i]:
-                        splus += 1
-                    # heter points larger than homo points
-                    if pairDis[j] > vecB[i]:
-                        sminus += + 1
+        splus, sminus = self.context.concordance(self.max_pairs, self.random_state)
         # compute the fitness
         self.validation = (splus - sminus) / (splus + sminus)
         return self.validation
@@ -188,87 +833,37 @@ class Validation:
         """
         The determinant ratio index, a measure of connectedness
         """
-        # compute the attributes number and cluster number
         self.description = 'Determinant ratio, a measure of connectedness'
-        attributes = len(self.data_matrix[0])
-        xData = self.data_matrix
-        wg = np.zeros((attributes, attributes))
-        numCluster = max(self.class_label) + 1
-        # compute cluster scatter matrix
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            xCluster = clusterMember
-            # iterate through attributes
-            for j in range(attributes):
-                columnVec = clusterMember[:, j]
-                columnCenter = np.mean(columnVec)
-                # compute xk
-                xCluster[:, j] = columnVec - columnCenter
-            # add to wg
-            wg += np.dot(np.transpose(xCluster), xCluster)
-        # compute data scatter matrix
-        for i in range(attributes):
-            columnVec = self.data_matrix[:, i]
-            columnCenter = np.mean(columnVec)
-            # data scatter matrix
-            xData[:, i] = columnVec - columnCenter
-
-        t = np.dot(np.transpose(xData), xData)
+        scatter = self.context.scatter()
         # compute the fitness
-        self.validation = np.linalg.det(t) / np.linalg.det(wg)
+        self.validation = np.linalg.det(scatter.total) / np.linalg.det(scatter.within)
         return self.validation
 
+    @sampled
     def c_index(self):
         """
         The C-Index, a measure of compactness
         """
         self.description = 'The C-Index, a measure of cluster compactness'
-        sw = 0
-        nw = 0
-        numCluster = max(self.class_label) + 1
-        # iterate through all the clusters
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute distance of every pair of points
-            list_clusterDis = distance.pdist(clusterMember)
-            sw = sw + sum(list_clusterDis)
-            nw = nw + len(list_clusterDis)
-        # compute the pairwise distance of the whole dataset
-        list_dataDis = distance.pdist(self.data_matrix)
-        # compute smin
-        sortedList = sorted(list_dataDis)
-        smin = sum(sortedList[0:nw])
-        # compute smax
-        sortedList = sorted(list_dataDis, reverse=True)
-        smax = sum(sortedList[0:nw])
+        ctx = self.context
+        sw = np.sum(ctx.within_sums())
+        nw = ctx.num_within
+        # sum of the nw smallest and largest pairwise distances of the whole dataset
+        smin = ctx.dataset.smallest_sum(nw)
+        smax = ctx.dataset.largest_sum(nw)
         # compute the fitness
         self.validation = (sw - smin) / (smax - smin)
         return self.validation
 
+    @sampled
     def g_plus_index(self):
         """
         The G_plus index, the proportion of discordant pairs among all the pairs of distinct point, a measure of connectedness
         """
         self.description = "The G_plus index, a measure of connectedness"
-        sminus = 0
-        pairDis = distance.pdist(self.data_matrix)
-        numPair = len(pairDis)
-        temp = np.zeros((len(self.class_label), 2))
-        temp[:, 0] = self.class_label
-        vecB = distance.pdist(temp)
-        # iterate through all the pairwise comparisons
-        for i in range(numPair - 1):
-            for j in range(i + 1, numPair):
-                if vecB[i] > 0 and vecB[j] == 0:
-                    # heter points larger than homo points
-                    if pairDis[i] > vecB[j]:
-                        sminus = sminus + 1
-                if vecB[i] == 0 and vecB[j] > 0:
-                    # heter points larger than homo points
-                    if pairDis[j] > vecB[i]:
-                        sminus = sminus + 1
+        ctx = self.context
+        splus, sminus = ctx.concordance(self.max_pairs, self.random_state)
+        numPair = ctx.num_pairs
         # return fitness
         self.validation = 2 * sminus / (numPair * (numPair - 1))
         return self.validation
@@ -278,25 +873,9 @@ class Validation:
         The Ksq_DetW Index, a measure of connectedness
         """
         self.description = "The Ksq_DetW index, a measure of connectedness"
-        # compute the attributes number and cluster number
-        attributes = len(self.data_matrix[0])
-        wg = np.zeros((attributes, attributes))
-        numCluster = max(self.class_label) + 1
-        # compute cluster scatter matrix
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            xCluster = clusterMember
-            # iterate through attributes
-            for j in range(attributes):
-                columnVec = clusterMember[:, j]
-                columnCenter = np.mean(columnVec)
-                # compute xk
-                xCluster[:, j] = columnVec - columnCenter
-            # add to wg
-            wg += np.dot(np.transpose(xCluster), xCluster)
+        ctx = self.context
         # compute fitness
-        self.validation = math.pow(numCluster, 2) * np.linalg.det(wg)
+        self.validation = math.pow(ctx.num_cluster, 2) * np.linalg.det(ctx.scatter().within)
         return self.validation
 
     def log_det_ratio(self):
@@ -313,57 +892,27 @@ class Validation:
         The log ss ratio, a measure of connectedness
         """
         self.description = "The log ss ratio, a measure of connectedness"
-        bgss = 0
-        wgss = 0
-        numCluster = max(self.class_label) + 1
-        # compute the dataset center
-        dataCenter = np.mean(self.data_matrix, 0)
-        # iterate through the cluster
-        for i in range(numCluster):
-            sumTemp = 0
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the center of the cluster
-            clusterCenter = np.mean(clusterMember, 0)
-            # add to bgss
-            bgss += len(indices) * math.pow(distance.euclidean(clusterCenter, dataCenter), 2)
-            # iterate through all the members of the cluster
-            for member in clusterMember:
-                sumTemp += math.pow(distance.euclidean(member, clusterCenter), 2)
-            wgss += sumTemp
+        ctx = self.context
+        # between-group and within-group sum of squares
+        bgss = np.sum(ctx.sizes * np.sum((ctx.centers - ctx.data_center) ** 2, axis=1))
+        wgss = np.sum(ctx.sse)
         # compute the fitness
         self.validation = math.log(bgss / wgss)
         return self.validation
 
+    @sampled
     def mcclain_rao(self):
         """
         The McClain-Rao Index, a measure of compactness
         """
         self.description = "The McClain-Rao Index, a measure of compactness"
-        sw = 0
-        sb = 0
-        nw = 0
-        numObj = len(self.class_label)
-        numCluster = max(self.class_label) + 1
-        # iterate through all the clusters
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute pairwise distance
-            pairDis = distance.pdist(clusterMember)
-            # add to sw and nw
-            sw += sum(pairDis)
-            nw += len(pairDis)
-            # iterate the clusters again for between-cluster distance
-            for j in range(numCluster):
-                if j > i:
-                    indices2 = [t for t, x in enumerate(self.class_label) if x == j]
-                    clusterMember2 = self.data_matrix[indices2, :]
-                    betweenDis = distance.cdist(clusterMember, clusterMember2)
-                    # add to sb
-                    sb += sum(list(itertools.chain(*betweenDis)))
+        ctx = self.context
+        stats = ctx.pair_stats()
+        sw = np.sum(stats.within_sum)
+        sb = stats.between_sum
+        nw = stats.within_count
         # compute nb
-        nb = numObj * (numObj - 1) / 2 - nw
+        nb = ctx.num_obj * (ctx.num_obj - 1) / 2 - nw
         # compute fitness
         self.validation = nb * sw / (nw * sb)
         return self.validation
@@ -373,57 +922,27 @@ class Validation:
         The PBM index, a measure of compactness
         """
         self.description = "The PBM index, a measure of compactness"
-        ew = 0
-        et = 0
-        list_centerDis = []
-        numCluster = max(self.class_label) + 1
-        # compute the center of the dataset
-        dataCenter = np.mean(self.data_matrix, 0)
-        # iterate through the  clusters
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the center of the cluster
-            clusterCenter = np.mean(clusterMember, 0)
-            # compute the center distance
-            list_centerDis.append(distance.euclidean(dataCenter, clusterCenter))
-            # iterate through the member of the  cluster
-            for member in clusterMember:
-                ew += distance.euclidean(member, clusterCenter)
-                et += distance.euclidean(member, dataCenter)
-        db = max(list_centerDis)
+        ctx = self.context
+        ew = np.sum(ctx.norm_sum)
+        et = np.sum(ctx.center_dis[ctx.clustered])
+        # max distance between the dataset center and a cluster center
+        db = np.max(np.linalg.norm(ctx.centers - ctx.data_center, axis=1))
         # compute the fitness
-        self.validation = math.pow(et * db / (numCluster * ew), 2)
+        self.validation = math.pow(et * db / (ctx.num_cluster * ew), 2)
         return self.validation
 
+    @sampled
     def point_biserial(self):
         """
         The Point-Biserial index, a measure of connectedness
         """
         self.description = "The Point-Biserial index, a measure of connectedness"
-        sw = 0
-        sb = 0
-        nw = 0
-        numObj = len(self.class_label)
-        numCluster = max(self.class_label) + 1
-        nt = numObj * (numObj - 1) / 2
-        # iterate through all the clusters
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute pairwise distance
-            pairDis = distance.pdist(clusterMember)
-            # add to sw and nw
-            sw += sum(pairDis)
-            nw += len(pairDis)
-            # iterate the clusters again for between-cluster distance
-            for j in range(numCluster):
-                if j > i:
-                    indices2 = [t for t, x in enumerate(self.class_label) if x == j]
-                    clusterMember2 = self.data_matrix[indices2, :]
-                    betweenDis = distance.cdist(clusterMember, clusterMember2)
-                    # add to sb
-                    sb += sum(list(itertools.chain(*betweenDis)))
+        ctx = self.context
+        stats = ctx.pair_stats()
+        sw = np.sum(stats.within_sum)
+        sb = stats.between_sum
+        nw = stats.within_count
+        nt = ctx.num_obj * (ctx.num_obj - 1) / 2
         # compute nb
         nb = nt - nw
         # compute fitness
@@ -435,28 +954,13 @@ class Validation:
         The Ratkowsky-Lance index, a measure of compactness
         """
         self.description = "The Ratkowsky-Lance index, a measure of compactness"
-        list_divide = []
-        attributes = len(self.data_matrix[0])
-        numCluster = max(self.class_label) + 1
-        # iterate through the attributes
-        for i in range(attributes):
-            bgssj = 0
-            tssj = 0
-            columnVec = self.data_matrix[:, i]
-            columnCenter = np.mean(columnVec)
-            # compute bgssj
-            for j in range(numCluster):
-                indices = [t for t, x in enumerate(self.class_label) if x == j]
-                columnCluster = self.data_matrix[indices, :]
-                centerCluster = np.mean(columnCluster)
-                bgssj += len(indices) * math.pow(centerCluster - columnCenter, 2)
-            # iterate through the  members of the column
-            for member in columnVec:
-                tssj += math.pow(member - columnCenter, 2)
-            list_divide.append(bgssj / tssj)
-        r = sum(list_divide) / attributes
+        ctx = self.context
+        scatter = ctx.scatter()
+        # ratio of the between-group to the total sum of squares of every attribute
+        list_divide = np.diag(scatter.between) / np.diag(scatter.total)
+        r = np.sum(list_divide) / ctx.attributes
         # compute the  fitness
-        self.validation = math.sqrt(r / numCluster)
+        self.validation = math.sqrt(r / ctx.num_cluster)
         return self.validation
 
     def ray_turi(self):
@@ -464,29 +968,12 @@ class Validation:
         The Ray-Turi index, a measure of compactness
         """
         self.description = "The Ray-Turi index, a measure of compactness"
-        wgss = 0
-        list_centers = []
-        numCluster = max(self.class_label) + 1
-        numObj = len(self.class_label)
-
-        for i in range(numCluster):
-            wgssk = 0
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the center of the cluster
-            clusterCenter = np.mean(clusterMember, 0)
-            # print(np.squeeze(np.asarray(clusterCenter)))
-            list_centers.append(np.asarray(clusterCenter))
-            # iterate through the  cluster members
-            for member in clusterMember:
-                wgssk += math.pow(distance.euclidean(member, clusterCenter), 2)
-            # add to wgsss
-            wgss += wgssk
+        ctx = self.context
+        wgss = np.sum(ctx.sse)
         # compute the min center dis
-        list_centers = np.concatenate(list_centers, axis=0)
-        minDis = math.pow(np.min(distance.pdist(list_centers)), 2)
+        minDis = math.pow(np.min(distance.pdist(ctx.centers)), 2)
         # compute the fitness
-        self.validation = wgss / (numObj * minDis)
+        self.validation = wgss / (ctx.num_obj * minDis)
         return self.validation
 
     def scott_symons(self):
@@ -495,71 +982,32 @@ class Validation:
         """
         self.description = "The Scott-Symons index, a measure of connectedness"
         fitness = 0
-        # compute the attributes number and cluster number
-        attributes = len(self.data_matrix[0])
-        numCluster = max(self.class_label) + 1
-        # compute cluster scatter matrix
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            nk = len(indices)
-            clusterMember = self.data_matrix[indices, :]
-            xCluster = clusterMember
-            # iterate through attributes
-            for j in range(attributes):
-                columnVec = clusterMember[:, j]
-                columnCenter = np.mean(columnVec)
-                # compute xk
-                xCluster[:, j] = columnVec - columnCenter
-            # compute wgk
-            wgk = np.dot(np.transpose(xCluster), xCluster)
-            if np.linalg.det(wgk / nk) != 0:
-                fitness += nk * math.log(np.linalg.det(wgk / nk))
+        ctx = self.context
+        scatter = ctx.scatter()
+        for i in range(ctx.num_cluster):
+            nk = ctx.sizes[i]
+            det = np.linalg.det(scatter.cluster_within[i] / nk)
+            if det != 0:
+                fitness += nk * math.log(det)
             else:
                 warnings.warn('Cannot calculate Scott_Symons, due to an undefined value', UserWarning)
         # return fitness
         self.validation = fitness
         return self.validation
 
+    @sampled
     def tau_index(self):
         """
         The Tau index, a measure of compactness
         """
         self.description = "The Tau index, a measure of compactness"
+        ctx = self.context
         # compute nb,nw,nt
-        nw = 0
-        numObj = len(self.class_label)
-        numCluster = max(self.class_label) + 1
-        nt = numObj * (numObj - 1) / 2
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            nk = len(indices)
-            nw += nk * (nk - 1) / 2
-        nb = nt - nw
+        nw = ctx.num_within
+        nb = ctx.num_between
+        nt = ctx.num_pairs
         # compute s+ and s-
-        splus = 0
-        sminus = 0
-        pairDis = distance.pdist(self.data_matrix)
-        numPair = nt
-        temp = np.zeros((len(self.class_label), 2))
-        temp[:, 0] = self.class_label
-        vecB = distance.pdist(temp)
-        # iterate through all the pairwise comparisons
-        for i in range(int(numPair - 1)):
-            for j in range(i + 1, int(numPair)):
-                if vecB[i] > 0 and vecB[j] == 0:
-                    # heter points smaller than homo points
-                    if pairDis[i] < pairDis[j]:
-                        splus += 1
-                    # heter points larger than homo points
-                    if pairDis[i] > vecB[j]:
-                        sminus += 1
-                if vecB[i] == 0 and vecB[j] > 0:
-                    # heter points smaller than homo points
-                    if pairDis[j] < pairDis[i]:
-                        splus += 1
-                    # heter points larger than homo points
-                    if pairDis[j] > vecB[i]:
-                        sminus += 1
+        splus, sminus = ctx.concordance(self.max_pairs, self.random_state)
         # compute the fitness
         self.validation = (splus - sminus) / math.sqrt(nb * nw * nt * (nt - 1) / 2)
         return self.validation
@@ -569,21 +1017,8 @@ class Validation:
         The Trace_W index, a measure of connectedness
         """
         self.description = "The Trace_W index, a measure of connectedness"
-        wgss = 0
-        numCluster = max(self.class_label) + 1
-        for i in range(numCluster):
-            wgssk = 0
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the center of the cluster
-            clusterCenter = np.mean(clusterMember, 0)
-            # iterate through the  cluster members
-            for member in clusterMember:
-                wgssk += math.pow(distance.euclidean(member, clusterCenter), 2)
-            # add to wgsss
-            wgss += wgssk
         # return the fitness
-        self.validation = wgss
+        self.validation = np.trace(self.context.scatter().within)
         return self.validation
 
     def trace_wib(self):
@@ -591,34 +1026,11 @@ class Validation:
         The Trace_WiB index, a measure of connectedness
         """
         self.description = "The Trace_WiB index, a measure of connectedness"
-        numCluster = max(self.class_label) + 1
-        attributes = len(self.data_matrix[0])
-        b = np.zeros((numCluster, attributes))
-        wg = np.zeros((attributes, attributes))
-        # compute the data center
-        dataCenter = np.mean(self.data_matrix, 0)
-        # iterate all the clusters
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            xCluster = clusterMember
-            # compute the center of the cluster
-            clusterCenter = np.mean(clusterMember, 0)
-            b[i, :] = clusterCenter - dataCenter
-            # compute wgk and wg
-            for j in range(attributes):
-                columnVec = clusterMember[:, j]
-                columnCenter = np.mean(columnVec)
-                # compute xk
-                xCluster[:, j] = columnVec - columnCenter
-            # compute wgk
-            wg += np.dot(np.transpose(xCluster), xCluster)
-        # compute bg
-        bg = np.dot(np.transpose(b), b)
+        scatter = self.context.scatter()
         # compute fitness
         try:
-            self.validation = np.trace(np.dot(np.linalg.inv(wg), bg))
-        except np.linalg.linalg.LinAlgError:
+            self.validation = np.trace(np.dot(np.linalg.inv(scatter.within), scatter.center_scatter))
+        except np.linalg.LinAlgError:
             # Numpy will thrown an exception on singular matricies
             # If this happens, warn the user and return 0
             warnings.warn('Cannot calculate trace_wib, due to an undefined value', UserWarning)
@@ -630,38 +1042,12 @@ class Validation:
         The Wemmert-Gancarski index, the quotients of distances between the points and the barycenters of all clusters, a measure of compactness
         """
         self.description = "The Wemmert-Gancarski index, a measure of compactness"
-        sum = 0
-        list_centers = []
-        attributes = len(self.data_matrix[0])
-        numObj = len(self.class_label)
-        numCluster = max(self.class_label) + 1
-        # compute all the centers
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the center of the cluster
-            list_centers.append(np.mean(clusterMember, 0))
-        # iterate the clusters again for Rm
-        for i in range(numCluster):
-            sumRm = 0
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the currrent center
-            clusterCenter = np.mean(clusterMember, 0)
-            tempList = list_centers
-            tempList = tempList[:i] + tempList[i + 1:]
-            # iterate through the member and compute rm
-            for member in clusterMember:
-                # make it a 2d array
-                memberArray = np.zeros((1, attributes))
-                memberArray[0, :] = member
-                # compute the pair wise distance
-                list_dis = distance.cdist(memberArray, tempList)
-                sumRm += (distance.euclidean(member, clusterCenter)) / min(min(list_dis))
-            # compute the sum
-            sum += max([0, len(indices) - sumRm])
+        ctx = self.context
+        # quotient of the distance to the own center and to the closest other center, for every member
+        rm = ctx.member_dis[ctx.clustered] / ctx.nearest_other_center()
+        sumRm = np.bincount(ctx.labels[ctx.clustered], weights=rm, minlength=ctx.num_cluster)
         # compute the fitness
-        self.validation = sum / numObj
+        self.validation = np.sum(np.maximum(0, ctx.sizes - sumRm)) / ctx.num_obj
         return self.validation
 
     def root_mean_square(self):
@@ -671,20 +1057,10 @@ class Validation:
         connectedness.
         """
         self.description = "The Root-Mean-Square Standard Deviation (RMSSTD), a measure of connectedness"
-        numCluster = max(self.class_label) + 1
-        attributes = len(self.data_matrix[0])
-        denominator = attributes * (len(self.data_matrix) - numCluster)
-        normSum = 0
-        # iterate through all the clusters
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the center of the cluster
-            clusterCenter = np.mean(clusterMember, 0)
-            # compute the square error for every member in the cluster
-            for member in clusterMember:
-                normSum += distance.euclidean(member, clusterCenter)
-        self.validation = math.sqrt(normSum / denominator)
+        ctx = self.context
+        attributes = self.data_matrix.shape[1]
+        denominator = attributes * (ctx.num_obj - ctx.num_cluster)
+        self.validation = math.sqrt(np.sum(ctx.norm_sum) / denominator)
         return self.validation
 
     def r_squared(self):
@@ -693,51 +1069,29 @@ class Validation:
         A measure of compactness.
         """
         self.description = "R-squared, a measure of compactness"
-        # compute the center of the dataset
-        dataCenter = np.mean(self.data_matrix, 0)
-        numCluster = max(self.class_label) + 1
-        normClusterSum = 0
-        normDatasetSum = 0
-        # iterate through all the clusters
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the center of the cluster
-            clusterCenter = np.mean(clusterMember, 0)
-            # compute the norm for every member in the cluster with cluster center and dataset center
-            for member in clusterMember:
-                normClusterSum += distance.euclidean(member, clusterCenter)
-                normDatasetSum += distance.euclidean(member, dataCenter)
+        ctx = self.context
+        normClusterSum = np.sum(ctx.norm_sum)
+        normDatasetSum = np.sum(ctx.center_dis[ctx.clustered])
         # compute the fitness
         self.validation = (normDatasetSum - normClusterSum) / normDatasetSum
         return self.validation
 
+    @sampled
     def modified_hubert_t(self):
         """
         The Modified Hubert T Statistic, a measure of compactness.
         """
         self.description = "The Modified Hubert T Statistic, a measure of compactness"
         sumDiff = 0
-        # compute the centers of all the clusters
-        list_center = []
-        numCluster = max(self.class_label) + 1
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            list_center.append(np.mean(clusterMember, 0))
-        size = len(self.class_label)
-        # iterate through each of the two pairs exhaustively
-        for i in range(size - 1):
-            for j in range(i + 1, size):
-                # get the cluster labels of the two objects
-                label1 = self.class_label[i]
-                label2 = self.class_label[j]
-                # compute the distance of the two objects
-                pairDistance = distance.euclidean(self.data_matrix[i], self.data_matrix[j])
-                # compute the distance of the cluster center of the two objects
-                centerDistance = distance.euclidean(list_center[label1], list_center[label2])
-                # add the product to the sum
-                sumDiff += pairDistance * centerDistance
+        ctx = self.context
+        # distances between the cluster centers, looked up by the labels of every pair of objects
+        # (a noise label of -1 indexes the last center, as the list lookup did)
+        centerDis = ctx.center_distances()
+        labels = ctx.sorted_labels
+        size = ctx.num_obj
+        # accumulate the products over tiles of the pairwise distance matrix
+        for start, stop, block in ctx.pair_blocks():
+            sumDiff += np.sum(block * centerDis[labels[start:stop]][:, labels[start:]])
         # compute the fitness
         self.validation = 2 * sumDiff / (size * (size - 1))
         return self.validation
@@ -747,30 +1101,14 @@ class Validation:
         The I index, a measure of compactness.
         """
         self.description = "The I Index, a measure of compactness."
-        normClusterSum = 0
-        normDatasetSum = 0
-        list_centers = []
-        # compute the number of clusters and attribute
-        attributes = len(self.data_matrix[0])
-        numCluster = max(self.class_label) + 1
-        # compute the center of the dataset
-        dataCenter = np.mean(self.data_matrix, 0)
-        # iterate through all the clusters
-        for i in range(numCluster):
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the center of the cluster
-            clusterCenter = np.mean(clusterMember, 0)
-            list_centers.append(np.asarray(clusterCenter))
-            # compute the norm for every member in the cluster with cluster center and dataset center
-            for member in clusterMember:
-                normClusterSum += distance.euclidean(member, clusterCenter)
-                normDatasetSum += distance.euclidean(member, dataCenter)
+        ctx = self.context
+        attributes = self.data_matrix.shape[1]
+        normClusterSum = np.sum(ctx.norm_sum)
+        normDatasetSum = np.sum(ctx.center_dis[ctx.clustered])
         # compute the max distance between cluster centers
-        list_centers = np.concatenate(list_centers, axis=0)
-        maxCenterDis = max(distance.pdist(list_centers))
+        maxCenterDis = max(distance.pdist(ctx.centers))
         # compute the fitness
-        self.validation = math.pow(((normDatasetSum * maxCenterDis) / (normClusterSum * numCluster)), attributes)
+        self.validation = math.pow(((normDatasetSum * maxCenterDis) / (normClusterSum * ctx.num_cluster)), attributes)
         return self.validation
 
     def davies_bouldin(self):
@@ -778,37 +1116,15 @@ class Validation:
         The Davies-Bouldin index, the average of all cluster similarities.
         """
         self.description = "The Davies-Bouldin index, the average of all cluster similarities"
-        numCluster = max(self.class_label) + 1
-        list_max = []
-        # iterate through the clusters
-        for i in range(numCluster):
-            list_tempMax = []
-            # get all members from cluster i
-            indices1 = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember1 = self.data_matrix[indices1, :]
-            # compute the cluster center
-            clusterCenter1 = np.mean(clusterMember1, 0)
-            # compute the cluster norm sum
-            sumNorm1 = 0
-            for member in clusterMember1:
-                sumNorm1 += distance.euclidean(member, clusterCenter1)
-            for j in range(numCluster):
-                if j != i:
-                    # get all members from cluster j
-                    indices2 = [t for t, x in enumerate(self.class_label) if x == j]
-                    clusterMember2 = self.data_matrix[indices2, :]
-                    # compute the cluster center
-                    clusterCenter2 = np.mean(clusterMember2, 0)
-                    # compute the cluster norm sum
-                    sumNorm2 = 0
-                    for member in clusterMember2:
-                        sumNorm2 += distance.euclidean(member, clusterCenter2)
-                    tempDis = (sumNorm1 / len(indices1) + sumNorm2 / len(indices2)) / distance.euclidean(clusterCenter1,
-                                                                                                         clusterCenter2)
-                    list_tempMax.append(tempDis)
-            list_max.append(max(list_tempMax))
+        ctx = self.context
+        # mean distance of the members to their center, per cluster
+        scatter = ctx.norm_sum / ctx.sizes
+        # similarity of every pair of distinct clusters
+        centerDis = ctx.center_distances()
+        np.fill_diagonal(centerDis, np.nan)
+        similarity = (scatter[:, None] + scatter[None, :]) / centerDis
         # compute the fitness
-        self.validation = sum(list_max) / numCluster
+        self.validation = np.sum(np.nanmax(similarity, axis=1)) / ctx.num_cluster
         return self.validation
 
     def xie_beni(self):
@@ -816,114 +1132,51 @@ class Validation:
         The Xie-Beni index, a measure of compactness.
         """
         self.description = "The Xie-Beni index, a measure of compactness"
-        numCluster = max(self.class_label) + 1
-        numObject = len(self.class_label)
-        sumNorm = 0
-        list_centers = []
-        for i in range(numCluster):
-            # get all members from cluster i
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the cluster center
-            clusterCenter = np.mean(clusterMember, 0)
-            list_centers.append(np.asarray(clusterCenter))
-            # interate through each member of the cluster
-            for member in clusterMember:
-                sumNorm += math.pow(distance.euclidean(member, clusterCenter), 2)
-        list_centers = np.concatenate(list_centers, axis=0)
-        minDis = min(distance.pdist(list_centers))
+        ctx = self.context
+        sumNorm = np.sum(ctx.sse)
+        minDis = min(distance.pdist(ctx.centers))
         # compute the fitness
-        self.validation = sumNorm / (numObject * pow(minDis, 2))
+        self.validation = sumNorm / (ctx.num_obj * pow(minDis, 2))
         return self.validation
 
-    ## density function for SDBW
-    @staticmethod
-    def __density(a, b, stdev):
-        dis = distance.euclidean(a, b)
-        if dis > stdev:
-            return 0
-        else:
-            return 1
-
-    # S_Dbw validity index SDBW
-    
-    # def SDBW(self):
-    #     sdbw_c = sdbw(self.data_raw, self.class_label, self.cluster_centers_)
-    #     self.validation = sdbw_c.sdbw_score()
-    #     return self.validation
-
-    def s_dbw(self):
-        score = S_Dbw(np.asarray(self.data_raw), self.class_label, centers_id=None, method='Halkidi', alg_noise='bind',centr='mean', nearest_centr=True, metric='euclidean')
-        self.validation = score
-        return self.validation
-    '''
-    
     def s_dbw(self):
         """
-        The S_Dbw index, a measure of compactness.
-        """
-        self.description = "The S_Dbw index, a measure of compactness"
-        sumDens = 0
-        sumNormCluster = 0
-        sumScat = 0
-        list_centers = []
-        temp_c1, temp_c2 = [], []
-        numCluster = max(self.class_label) + 1
-        # compute the norm of sigma(dataset)
-        normSigDataset = np.linalg.norm(np.var(self.data_matrix, 0))
-        # iterate through all the clusters of self.class_label
-        for i in range(numCluster):
-            # get all members from cluster i
-            indices = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember = self.data_matrix[indices, :]
-            # compute the cluster center
-            clusterCenter = np.mean(clusterMember, 0)
-            list_centers.append(clusterCenter)
-            normSigCluster = np.linalg.norm(np.var(clusterMember, 0))
-            sumScat += normSigCluster / normSigDataset
-            sumNormCluster += normSigCluster
-        # compute stdev
-        stdev = math.sqrt(sumNormCluster) / numCluster
-        # iterate again for density_bw
-        for i in range(numCluster):
-            sumDensity1 = 0
-            sumTemp = 0
-            # get all members from cluster i
-            indices1 = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember1 = self.data_matrix[indices1, :]
-            temp_c1 = clusterMember1.copy()
-            # compute sum of f(x,ci)
-            for member in clusterMember1:
-                sumDensity1 += Validation.__density(member, list_centers[i], stdev)
-            for j in range(numCluster):
-                if j != i:
-                    sumDensity2 = 0
-                    sumDensityCombine = 0
-                    # get all members from cluster j
-                    indices2 = [t for t, x in enumerate(self.class_label) if x == j]
-                    clusterMember2 = self.data_matrix[indices2, :]
-                    temp_c2 = clusterMember2.copy()
-                    # compute sum of f(x,cj)
-                    for member in clusterMember2:
-                        sumDensity2 += Validation.__density(member, list_centers[j], stdev)
-                    # compute the middle point of the two cluster centers
-                    midPoint = []
-                    for k in range(len(list_centers[0])):
-                        midPoint.append(np.asarray(list_centers[i][k] + list_centers[j][k]) / 2)
-                    # compute sum of f(x,uij)
-                    midPoint = np.concatenate(midPoint, axis=0)
-                    combined = np.concatenate((temp_c1, temp_c2))
-                    for member in combined:
-                        sumDensityCombine += Validation.__density(member, midPoint, stdev)
-                    sumTemp += sumDensityCombine / max([sumDensity1, sumDensity2])
-            sumDens += sumTemp
-        # compute scat and dens_bw
-        scat = sumScat / numCluster
-        dens_bw = sumDens / (numCluster * (numCluster - 1))
+        The S_Dbw index (Halkidi), the sum of the average scattering of the clusters and of the inter-cluster density.
+        Noise objects are bound to the cluster of their nearest clustered object, and every cluster is represented by
+        its member closest to the centroid.
+        """
+        self.description = "The S_Dbw index, a measure of compactness and separation"
+        ctx = self.context
+        if not 2 <= len(np.unique(ctx.labels)) <= ctx.num_obj - 1:
+            raise ValueError("No. of unique labels must be > 1 and < n_samples")
+        ctx = ctx.bind_noise()
+        present = np.flatnonzero(ctx.sizes)
+        k = len(present)
+        if k < 2:
+            raise ValueError("Only one cluster!")
+        # norm of the standard deviation vector of every cluster and of the dataset
+        stdCluster = np.sqrt(ctx.sse[present] / ctx.sizes[present])
+        stdDataset = math.sqrt(np.mean(np.square(ctx.center_dis)))
+        scat = np.sum(stdCluster) / (stdDataset * k)
+        # count the members of every cluster lying within stdev of the midpoint between its representative and the
+        # representative of every cluster (the representative itself for the cluster's own density)
+        stdev = math.sqrt(np.sum(stdCluster)) / k
+        represent = ctx.representatives()[present]
+        rows = max(1, ctx.block_elements // k)
+        near = np.zeros((k, k))
+        for a, i in enumerate(present):
+            members = ctx.data[ctx.members(i)]
+            midpoints = (represent[a] + represent) / 2
+            for start in range(0, len(members), rows):
+                near[a] += np.sum(distance.cdist(members[start:start + rows], midpoints) <= stdev, axis=0)
+        density = np.diag(near)
+        if np.count_nonzero(density == 0) > 1:
+            raise ValueError("The density for two or more clusters to equal zero.")
+        between = ~np.eye(k, dtype=bool)
+        dens_bw = np.sum(((near + near.T) / np.maximum.outer(density, density))[between]) / (k * (k - 1))
         # compute the fitness
         self.validation = scat + dens_bw
         return self.validation
-    '''
     
 
     def dunns_index(self):
@@ -931,34 +1184,17 @@ class Validation:
         Dunn's index, a measure of cluster compactness
         """
         self.description = "Dunn's Index, a measure of compactness"
-        list_diam = []
-        list_minDis = []
-        numCluster = max(self.class_label) + 1
-        # iterate through the clusters
-        for i in range(numCluster - 1):
-            # get all members from cluster i
-            indices1 = [t for t, x in enumerate(self.class_label) if x == i]
-            clusterMember1 = self.data_matrix[indices1, :]
-            # compute the diameter of the cluster
-            list_diam.append(max(distance.pdist(clusterMember1)))
-            for j in range(i + 1, numCluster):
-                # get all members from cluster j
-                indices2 = [t for t, x in enumerate(self.class_label) if x == j]
-                clusterMember2 = self.data_matrix[indices2, :]
-                # compute the diameter of the cluster
-                diameter = distance.pdist(clusterMember2)
-                # If it is zero, the value is undefined
-                if len(diameter) == 0:
-                    warnings.warn('Cannot calculate Dunns_index, due to an undefined value', UserWarning)
-                    self.validation = 0
-                    return self.validation
-                list_diam.append(max(diameter))
-                # get the pairwise distance and find the minimum
-                pairDis = distance.cdist(clusterMember1, clusterMember2)
-                minDis = min(list(itertools.chain(*pairDis)))
-                list_minDis.append(minDis)
+        ctx = self.context
+        if ctx.num_cluster < 2:
+            raise ValueError("Dunn's index needs at least two clusters")
+        # If a cluster has a single member, its diameter is undefined
+        if np.any(ctx.sizes < 2):
+            warnings.warn('Cannot calculate Dunns_index, due to an undefined value', UserWarning)
+            self.validation = 0
+            return self.validation
         # compute the fitness
-        return min(list_minDis) / max(list_diam)
+        self.validation = ctx.min_separation() / ctx.max_diameter(self.approximate_diameter)
+        return self.validation
 
     def run_all(self):
         metric_scores = {}
@@ -967,8 +1203,7 @@ class Validation:
         for key in keys:
             metric_scores[key] = "none"
 
-            if key in ["baker_hubert_gamma", "tau_index", "g_plus_index", "log_ss_ratio", "log_det_ratio", "det_ratio",
-                       "run_all", "ksq_detw_index", "modified_hubert_t"]:
+            if key in ["log_ss_ratio", "log_det_ratio", "det_ratio", "run_all", "ksq_detw_index", "modified_hubert_t"]:
                 continue
 
             try:
@@ -986,3 +1221,4 @@ class Validation:
             metric_scores[key] = eval("self." + key + "()")
 
         return metric_scores
+
@@ -11,6 +11,9 @@ from collections import OrderedDict
 
 import redis
 
+# Evaluations kept across runs, to warm-start searches on the same dataset
+EVALUATION_STORE = "./csmartml/evaluations.sqlite"
+
 
 def initialize_app():
 	app = Flask(__name__)
@@ -63,21 +66,23 @@ def initialize_app():
 			alg = task_data["algorithm"]
 			metric = task_data["metric"]
 			comb = cm.CSmartML(dataset, POP_SIZE, time_budget, publish, False, algorithm=alg, cvi=metric,
-							   dataset=uploadedData, result=resultPreference)
+							   dataset=uploadedData, result=resultPreference, store=EVALUATION_STORE)
 			pops, algorithm = comb.search(publish)
 		else:
-			comb = cm.CSmartML(dataset, POP_SIZE, time_budget, publish, True, dataset=uploadedData, result=resultPreference)
+			comb = cm.CSmartML(dataset, POP_SIZE, time_budget, publish, True, dataset=uploadedData, result=resultPreference,
+							   store=EVALUATION_STORE)
 			pops, algorithm = comb.search(publish)
 
 		while pops is None:
 			time.sleep(time_budget)
 
+		# The labels scored by the search, on the data it clustered
+		data = comb.data
 		i = 0
 		configurations = {}
 		configuration_values = {}
 		for pop in pops:
-			cluster = pop[0].fit(data)
-			configurations["CONFIG-{}".format(i)] = cluster.labels_.tolist()
+			configurations["CONFIG-{}".format(i)] = pop.labels.tolist()
 			configuration_values["CONFIG-{}".format(i)] = str(pop[0])
 			i += 1
 